@@ -0,0 +1,30 @@
+"""
+Gunicorn settings for analytics_service; read from the working directory by
+
+    gunicorn app:app
+
+Workers are threaded (gthread) by default: requests wait on order_service
+and then do a short pandas aggregation, so several threads per process
+keep the CPU busy while others wait.
+
+Environment Variables:
+PORT                  - Listen port (default: 5006)
+WEB_CONCURRENCY       - Worker processes (default: 2 x CPUs + 1, at most GUNICORN_MAX_WORKERS)
+GUNICORN_MAX_WORKERS  - Cap for the derived worker count (default: 8)
+GUNICORN_WORKER_CLASS - gthread, gevent or sync (default: gthread)
+GUNICORN_THREADS      - Threads per gthread worker (default: 4)
+GUNICORN_WORKER_CONNECTIONS - Concurrent requests per gevent worker (default: 1000)
+GUNICORN_TIMEOUT      - Seconds before a silent worker is restarted (default: 30)
+"""
+import os
+from eai_common.workers import gunicorn_workers
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5006)}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = gunicorn_workers()
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
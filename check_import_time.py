@@ -0,0 +1,117 @@
+"""
+Import-time gate for the Python services.
+
+    python check_import_time.py                  # all services
+    python check_import_time.py product_service --runs 5
+
+Imports each service's entry module in a fresh interpreter under
+``python -X importtime`` and fails (exit 1) when it exceeds its budget:
+
+- ``own``: self time of the service's own modules. This is the work done at
+  import by the service itself (schema creation, seeding, network calls) and
+  is largely independent of machine speed. Budget 100 ms, 50 ms for
+  product_service, which does no database work at import.
+- ``total``: cumulative import time including third-party packages. Default
+  budget 2000 ms; scale it for slow machines with --total-scale.
+
+Each service is imported once to warm bytecode caches, then --runs times;
+the median is reported along with the slowest own modules. Services whose
+dependencies are not installed fail, or are skipped with --skip-missing.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# service directory -> (entry module, own budget ms, total budget ms)
+SERVICES = {
+    "product_service": ("app", 50, 2000),
+    "order_service": ("app", 100, 2000),
+    "customer_service": ("app", 100, 2000),
+    "inventory_service": ("app", 100, 2000),
+    "analytics_service": ("app", 100, 2000),
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def own_modules(service_dir):
+    return {name[:-3] for name in os.listdir(service_dir) if name.endswith(".py")}
+
+
+def measure(service, module):
+    """Import module once; return (own us by module, total us) or raise RuntimeError"""
+    service_dir = os.path.join(ROOT, service)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=service_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+        raise RuntimeError(error)
+
+    own = own_modules(service_dir)
+    own_times = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        if name in own:
+            own_times[name] = own_times.get(name, 0) + int(self_us)
+        if name == module:
+            total = int(cumulative_us)
+    return own_times, total
+
+
+def check(service, runs, total_scale):
+    module, own_budget, total_budget = SERVICES[service]
+    total_budget *= total_scale
+    measure(service, module)  # warm up bytecode caches
+    samples = [measure(service, module) for _ in range(runs)]
+
+    own_ms = statistics.median(sum(times.values()) for times, _ in samples) / 1000
+    total_ms = statistics.median(total for _, total in samples) / 1000
+    slowest = sorted(samples[-1][0].items(), key=lambda item: -item[1])[:3]
+    passed = own_ms <= own_budget and total_ms <= total_budget
+
+    print(
+        f"{'ok  ' if passed else 'FAIL'} {service:<20} own {own_ms:7.1f} / {own_budget} ms"
+        f"   total {total_ms:7.1f} / {total_budget:.0f} ms"
+        f"   slowest: {', '.join(f'{name} {us / 1000:.1f} ms' for name, us in slowest)}"
+    )
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when a service is slow to import")
+    parser.add_argument("services", nargs="*", default=list(SERVICES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--total-scale", type=float, default=1.0,
+                        help="multiply total budgets, e.g. 2 on a slow CI runner")
+    parser.add_argument("--skip-missing", action="store_true",
+                        help="skip services whose dependencies are not installed")
+    args = parser.parse_args()
+
+    failed = False
+    for service in args.services:
+        if service not in SERVICES:
+            parser.error(f"unknown service {service}; expected one of {', '.join(SERVICES)}")
+        try:
+            failed |= not check(service, args.runs, args.total_scale)
+        except RuntimeError as e:
+            missing = "ModuleNotFoundError" in str(e)
+            print(f"{'skip' if missing and args.skip_missing else 'FAIL'} {service:<20} {e}")
+            failed |= not (missing and args.skip_missing)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
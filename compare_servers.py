@@ -0,0 +1,176 @@
+"""
+Throughput of the production launchers against the development servers.
+
+    python compare_servers.py product_service
+    python compare_servers.py order_service --path /orders --concurrency 64 --duration 20
+    python compare_servers.py customer_service --env WEB_CONCURRENCY=4
+
+For the given service, starts the development server (``python app.py``,
+or single-process uvicorn for the ASGI services) and then the production
+launcher (gunicorn with gunicorn.conf.py, or serve.py) on the service's
+port, drives each with a fixed number of keep-alive clients for a fixed
+time, wrk-style, and prints requests/s, latency percentiles and errors
+side by side.
+
+Both runs use a scratch copy of the service directory, so databases and
+JSON files in the tree are not touched. The production launchers import
+the shared helpers, so install them first (``pip install -e shared``).
+
+The load generator shares the machine with the server; on small machines
+give it fewer clients or run wrk against the printed URL instead
+(e.g. ``wrk -t4 -c64 -d20s URL``).
+"""
+import argparse
+import http.client
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# service directory -> (port, default path, development command, production command)
+SERVICES = {
+    "product_service": (5002, "/products", [sys.executable, "app.py"],
+                        ["gunicorn", "app:create_app()"]),
+    "order_service": (5004, "/orders", [sys.executable, "app.py"],
+                      ["gunicorn", "app:app"]),
+    "analytics_service": (5006, "/health", [sys.executable, "app.py"],
+                          ["gunicorn", "app:app"]),
+    "customer_service": (5000, "/health", [sys.executable, "-m", "uvicorn", "app:app", "--port", "5000"],
+                         [sys.executable, "serve.py"]),
+    "inventory_service": (5003, "/health", [sys.executable, "app.py"],
+                          [sys.executable, "serve.py"]),
+}
+
+# Order service without MySQL stores orders in a JSON file, which is single-process
+DEFAULT_ENV = {
+    "order_service": {"MYSQL_HOST": "127.0.0.1", "MYSQL_PORT": "1"},
+}
+
+
+def wait_ready(port, path, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", path)
+            if connection.getresponse().status < 500:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def stop(process):
+    """Stop the server and every process it started (reloader, workers)"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def load(port, path, concurrency, duration):
+    """Run keep-alive clients for duration seconds; return (latencies, errors)"""
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        own = []
+        own_errors = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    own_errors += 1
+                    continue
+                own.append(time.perf_counter() - start)
+                if response.getheader("Connection", "").lower() == "close":
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                own_errors += 1
+                connection.close()
+        with lock:
+            latencies.extend(own)
+            errors[0] += own_errors
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def run(label, service, command, env, args):
+    port = SERVICES[service][0]
+    workdir = tempfile.mkdtemp(prefix=f"{service}_{label}_")
+    shutil.copytree(os.path.join(ROOT, service), workdir, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    try:
+        if not wait_ready(port, args.path, args.startup_timeout):
+            print(f"{label}: server did not become ready; see {log.name}")
+            return None
+        load(port, args.path, args.concurrency, 1)  # warm-up
+        latencies, errors = load(port, args.path, args.concurrency, args.duration)
+    finally:
+        stop(process)
+        log.close()
+    latencies.sort()
+    result = {
+        "rps": len(latencies) / args.duration,
+        "p50": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+        "errors": errors,
+    }
+    print(f"{label:<5} {' '.join(os.path.basename(part) for part in command):<28} {result['rps']:9.0f} req/s   "
+          f"p50 {result['p50']:7.1f} ms   p99 {result['p99']:7.1f} ms   errors {errors}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dev server and production launcher throughput")
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--path", help="request path (default: per service)")
+    parser.add_argument("--concurrency", type=int, default=32, help="keep-alive clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per server")
+    parser.add_argument("--startup-timeout", type=float, default=30)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment for both servers, e.g. WEB_CONCURRENCY=4")
+    args = parser.parse_args()
+
+    port, default_path, dev_command, prod_command = SERVICES[args.service]
+    args.path = args.path or default_path
+    env = dict(os.environ, **DEFAULT_ENV.get(args.service, {}))
+    env.update(item.split("=", 1) for item in args.env)
+
+    print(f"GET http://127.0.0.1:{port}{args.path}, {args.concurrency} clients, {args.duration:g} s each")
+    dev = run("dev", args.service, dev_command, env, args)
+    prod = run("prod", args.service, prod_command, env, args)
+    if not dev or not prod:
+        sys.exit(1)
+    print(f"throughput x{prod['rps'] / dev['rps']:.2f}, p99 latency x{prod['p99'] / dev['p99']:.2f}"
+          if dev["rps"] and dev["p99"] else "dev server served no requests")
+
+
+if __name__ == "__main__":
+    main()
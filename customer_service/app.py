@@ -1,27 +1,104 @@
-from flask import Flask, request, jsonify
-from ariadne import graphql_sync, make_executable_schema, load_schema_from_path
+import asyncio
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse
+from starlette.routing import Route
+from ariadne import graphql, make_executable_schema, load_schema_from_path
 from ariadne.explorer import ExplorerGraphiQL
 from resolvers import query
+from gql_client import PRODUCT_CHANGES_WATCH, close_client, cache_stats, watch_product_changes
+from customers import init_db
+from document_cache import DocumentCache
+from eai_common.persisted_queries import PersistedQueryNotFound, PersistedQueryStore
 import os
 
-app = Flask(__name__)
+# Production by default: no tracebacks in error responses. Set GRAPHQL_DEBUG=true locally.
+GRAPHQL_DEBUG = os.getenv("GRAPHQL_DEBUG", "false").lower() == "true"
+DOCUMENT_CACHE_SIZE = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", 1000))
+PERSISTED_QUERY_CACHE_SIZE = int(os.getenv("GRAPHQL_PERSISTED_QUERY_CACHE_SIZE", 1000))
+PERSISTED_QUERIES_FILE = os.getenv("GRAPHQL_PERSISTED_QUERIES_FILE")
 
 type_defs = load_schema_from_path("schema.graphql")
 schema = make_executable_schema(type_defs, query)
 
-@app.route("/graphql", methods=["GET"])
-def graphql_playground():
-    return ExplorerGraphiQL().html(None), 200
+document_cache = DocumentCache(DOCUMENT_CACHE_SIZE)
+persisted_queries = PersistedQueryStore(PERSISTED_QUERY_CACHE_SIZE)
+if PERSISTED_QUERIES_FILE:
+    persisted_queries.load_manifest(PERSISTED_QUERIES_FILE)
 
-@app.route("/graphql", methods=["POST"])
-def graphql_server():
-    data = request.get_json()
-    success, result = graphql_sync(schema, data, context_value=request, debug=True)
-    return jsonify(result)
+async def graphql_playground(request: Request):
+    return HTMLResponse(ExplorerGraphiQL().html(None), status_code=200)
 
-@app.route("/", methods=["GET"])
-def index():
-    return jsonify({"message": "Customer Service API. Please use the GraphQL endpoint at /graphql"})
+async def graphql_server(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:  # JSONDecodeError, or a body that is not UTF-8
+        return JSONResponse({"errors": [{"message": "Request body must be valid JSON"}]}, status_code=400)
+    if not isinstance(data, dict):
+        return JSONResponse({"errors": [{"message": "Request body must be a JSON object"}]}, status_code=400)
+    extensions = data.get("extensions") or {}
+    if not isinstance(extensions, dict):
+        return JSONResponse({"errors": [{"message": "extensions must be a JSON object"}]}, status_code=400)
+    persisted = extensions.get("persistedQuery")
+    if persisted:
+        try:
+            data["query"] = persisted_queries.resolve(persisted["sha256Hash"], data.get("query"))
+        except PersistedQueryNotFound:
+            # Client retries once with the full query text, which is then remembered
+            return JSONResponse({"errors": [{
+                "message": "PersistedQueryNotFound",
+                "extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"},
+            }]})
+        except (KeyError, TypeError, ValueError) as e:
+            return JSONResponse({"errors": [{"message": f"Invalid persisted query: {e}"}]}, status_code=400)
+    # Async execution: independent upstream resolvers run concurrently
+    success, result = await graphql(
+        schema,
+        data,
+        context_value=request,
+        query_parser=document_cache.parse,
+        query_validator=document_cache.validate,
+        debug=GRAPHQL_DEBUG,
+    )
+    return JSONResponse(result)
+
+async def index(request: Request):
+    return JSONResponse({"message": "Customer Service API. Please use the GraphQL endpoint at /graphql"})
+
+async def health(request: Request):
+    return JSONResponse({"status": "UP"})
+
+async def cache_metrics(request: Request):
+    return JSONResponse(cache_stats())
+
+async def graphql_metrics(request: Request):
+    return JSONResponse({
+        "documents": document_cache.stats(),
+        "persisted_queries": persisted_queries.stats(),
+    })
+
+@asynccontextmanager
+async def lifespan(app):
+    init_db()
+    watcher = asyncio.create_task(watch_product_changes()) if PRODUCT_CHANGES_WATCH else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await close_client()
+
+app = Starlette(
+    routes=[
+        Route("/graphql", graphql_playground, methods=["GET"]),
+        Route("/graphql", graphql_server, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics/cache", cache_metrics, methods=["GET"]),
+        Route("/metrics/graphql", graphql_metrics, methods=["GET"]),
+        Route("/", index, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.getenv("PORT", 5000)))
@@ -0,0 +1,97 @@
+"""
+Customer store lookup benchmark.
+
+    python bench_customers.py --customers 1000000 --db /tmp/customers_bench.db
+
+Seeds the store up to ``--customers`` rows (reusing an existing file), then
+times the lookups order validation depends on, both against the store
+directly and through the in-process GraphQL schema (parse + validate +
+execute, no HTTP). Reports p50/p95/p99 in microseconds.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": statistics.fmean(samples),
+    }
+
+
+def _bench(label, fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    stats = _percentiles(samples)
+    print(f"{label:<34} p50 {stats['p50']:8.1f}us  p95 {stats['p95']:8.1f}us  "
+          f"p99 {stats['p99']:8.1f}us  mean {stats['mean']:8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark customer lookups")
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--db", help="SQLite file to use (defaults to DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+
+    # Imported after DATABASE_URL is settled
+    from sqlalchemy import func, select
+    from ariadne import graphql_sync
+    from database import engine
+    from models import Customer
+    from customers import get_customer, get_customer_by_email, get_customers, list_customers, init_db
+    import seed
+
+    init_db()
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(Customer)).scalar()
+    if existing < args.customers:
+        print(f"Seeding {args.customers - existing} customers...")
+        start = time.perf_counter()
+        seed._insert_batches(seed.synthetic_customers(args.customers - existing))
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+    with engine.connect() as conn:
+        total, max_id = conn.execute(select(func.count(), func.max(Customer.id))).one()
+    print(f"{total} customers in {engine.url}")
+
+    from app import schema
+
+    random_id = lambda: random.randint(1, max_id)
+    _bench("get_customer(id)", lambda: get_customer(random_id()), args.iterations)
+    _bench("get_customer(missing id)", lambda: get_customer(max_id + 1), args.iterations)
+    _bench(
+        "get_customer_by_email",
+        lambda: get_customer_by_email(f"customer{random_id()}@example.com"),
+        args.iterations,
+    )
+    _bench(
+        "get_customers(100 ids)",
+        lambda: get_customers([random_id() for _ in range(100)]),
+        args.iterations // 10,
+    )
+    deep_cursor = list_customers(1, None)["edges"][0]["cursor"]
+    _bench("list_customers(first=100)", lambda: list_customers(100, deep_cursor), args.iterations // 10)
+
+    query = "query GetCustomer($id: Int!) { getCustomer(id: $id) { id name email } }"
+    _bench(
+        "graphql getCustomer (in-process)",
+        lambda: graphql_sync(schema, {"query": query, "variables": {"id": random_id()}}),
+        args.iterations,
+    )
+
+
+if __name__ == "__main__":
+    main()
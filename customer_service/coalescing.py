@@ -0,0 +1,80 @@
+"""
+Request coalescing for upstream lookups.
+
+``BatchLoader`` collects keys requested by concurrent resolvers for a short
+window (or one event-loop tick when the window is 0) and resolves them with
+one bulk upstream call. A key that is already queued or in flight is not
+requested again; its callers share the same future.
+"""
+import asyncio
+
+
+class BatchLoader:
+    def __init__(self, batch_fn, window=0.0, max_batch_size=100):
+        """
+        ``batch_fn(keys)`` is awaited with a list of distinct keys and must
+        return a dict mapping each key to its value; missing keys resolve to
+        ``None``.
+        """
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.pending = {}
+        self.inflight = {}
+        self.flush_handle = None
+        self.loads = 0
+        self.deduplicated = 0
+        self.batches = 0
+
+    def load(self, key):
+        self.loads += 1
+        future = self.pending.get(key) or self.inflight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            return asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self.flush_handle is None:
+            loop = asyncio.get_running_loop()
+            if self.window > 0:
+                self.flush_handle = loop.call_later(self.window, self._flush)
+            else:
+                self.flush_handle = loop.call_soon(self._flush)
+        return asyncio.shield(future)
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, {}
+        if batch:
+            self.inflight.update(batch)
+            self.batches += 1
+            asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        try:
+            results = await self.batch_fn(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark retrieved: every waiter may have given up already
+                    future.exception()
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(key))
+        finally:
+            for key in batch:
+                self.inflight.pop(key, None)
+
+    def stats(self):
+        return {
+            "loads": self.loads,
+            "deduplicated": self.deduplicated,
+            "batches": self.batches,
+            "avg_batch_size": round((self.loads - self.deduplicated) / self.batches, 2) if self.batches else None,
+        }
@@ -0,0 +1,102 @@
+"""
+Customer store queries.
+
+Every lookup is a single indexed statement (primary key, the unique email
+index, or an ``id IN (...)`` batch), so order validation stays well under a
+millisecond server-side even with millions of rows. Listings use keyset
+pagination on ``id``: a cursor is the opaque, base64-encoded id of the last
+customer on a page.
+"""
+import base64
+import binascii
+from sqlalchemy import bindparam, insert, select
+from database import engine, Base
+from models import Customer
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 1000
+
+# Shipped demo customers, inserted when the store is empty
+DEFAULT_CUSTOMERS = [
+    {"id": 1, "name": "John Doe", "email": "john@example.com"},
+    {"id": 2, "name": "Jane Smith", "email": "jane@example.com"},
+    {"id": 3, "name": "Bob Johnson", "email": "bob@example.com"},
+]
+
+_columns = (Customer.id, Customer.name, Customer.email)
+_by_id = select(*_columns).where(Customer.id == bindparam("id"))
+_by_email = select(*_columns).where(Customer.email == bindparam("email"))
+_by_ids = select(*_columns).where(Customer.id.in_(bindparam("ids", expanding=True)))
+
+
+def init_db():
+    """Create the customers table and seed the demo customers into an empty store"""
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        if conn.execute(select(Customer.id).limit(1)).first() is None:
+            conn.execute(insert(Customer), DEFAULT_CUSTOMERS)
+
+
+def encode_cursor(customer_id):
+    return base64.urlsafe_b64encode(str(customer_id).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.b64decode(cursor.encode(), altchars=b"-_", validate=True).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def clamp_page_size(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise ValueError("first must be at least 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def get_customer(customer_id):
+    with engine.connect() as conn:
+        row = conn.execute(_by_id, {"id": customer_id}).mappings().first()
+    return dict(row) if row else None
+
+
+def get_customer_by_email(email):
+    with engine.connect() as conn:
+        row = conn.execute(_by_email, {"email": email.strip().lower()}).mappings().first()
+    return dict(row) if row else None
+
+
+def get_customers(customer_ids):
+    """Return customers in the order requested, with None for unknown ids"""
+    if len(customer_ids) > MAX_BATCH_SIZE:
+        raise ValueError(f"at most {MAX_BATCH_SIZE} ids per request")
+    if not customer_ids:
+        return []
+    with engine.connect() as conn:
+        rows = conn.execute(_by_ids, {"ids": list(set(customer_ids))}).mappings().all()
+    found = {row["id"]: dict(row) for row in rows}
+    return [found.get(customer_id) for customer_id in customer_ids]
+
+
+def list_customers(first=None, after=None):
+    """Return one page of customers ordered by id as a Relay-style connection"""
+    limit = clamp_page_size(first)
+    query = select(*_columns).order_by(Customer.id).limit(limit + 1)
+    if after is not None:
+        query = query.where(Customer.id > decode_cursor(after))
+    with engine.connect() as conn:
+        rows = conn.execute(query).mappings().all()
+    edges = [
+        {"cursor": encode_cursor(row["id"]), "node": dict(row)}
+        for row in rows[:limit]
+    ]
+    return {
+        "edges": edges,
+        "pageInfo": {
+            "hasNextPage": len(rows) > limit,
+            "endCursor": edges[-1]["cursor"] if edges else None,
+        },
+    }
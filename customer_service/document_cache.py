@@ -0,0 +1,80 @@
+"""
+Parsed-document and validation caching for the customer GraphQL endpoint.
+
+- ``DocumentCache`` plugs into ariadne's ``query_parser``/``query_validator``
+  hooks. Documents are kept in an LRU keyed by the sha256 of the query text,
+  and each cached document remembers its validation result, so a repeated
+  query skips both parse and validate.
+
+Automatic Persisted Queries use the shared ``eai_common.persisted_queries``
+store, keyed by the same sha256 hash.
+"""
+from collections import OrderedDict
+from graphql import parse, validate
+from eai_common.persisted_queries import hash_query
+
+
+class _CachedDocument:
+    __slots__ = ("document", "errors")
+
+    def __init__(self, document):
+        self.document = document
+        self.errors = None
+
+
+class DocumentCache:
+    """LRU of query hash -> parsed document and its validation errors"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.documents = OrderedDict()
+        # id(document) -> cache entry, so the validator can find its slot
+        self.by_document = {}
+        self.parse_hits = 0
+        self.parse_misses = 0
+        self.validate_hits = 0
+        self.validate_misses = 0
+
+    def parse(self, _context, data):
+        key = hash_query(data["query"])
+        entry = self.documents.get(key)
+        if entry is not None:
+            self.parse_hits += 1
+            self.documents.move_to_end(key)
+            return entry.document
+        self.parse_misses += 1
+        # Syntax errors raise here and are never cached
+        entry = _CachedDocument(parse(data["query"]))
+        self.documents[key] = entry
+        self.by_document[id(entry.document)] = entry
+        while len(self.documents) > self.maxsize:
+            _, evicted = self.documents.popitem(last=False)
+            self.by_document.pop(id(evicted.document), None)
+        return entry.document
+
+    def validate(self, schema, document, rules=None, max_errors=None, type_info=None):
+        # Rules are fixed per endpoint, so the result depends only on the document
+        entry = self.by_document.get(id(document))
+        if entry is not None and entry.errors is not None:
+            self.validate_hits += 1
+            return entry.errors
+        self.validate_misses += 1
+        errors = validate(schema, document, rules=rules, max_errors=max_errors, type_info=type_info)
+        if entry is not None:
+            entry.errors = errors
+        return errors
+
+    def stats(self):
+        def rate(hits, misses):
+            return round(hits / (hits + misses), 4) if hits + misses else None
+
+        return {
+            "size": len(self.documents),
+            "maxsize": self.maxsize,
+            "parse_hits": self.parse_hits,
+            "parse_misses": self.parse_misses,
+            "parse_hit_rate": rate(self.parse_hits, self.parse_misses),
+            "validate_hits": self.validate_hits,
+            "validate_misses": self.validate_misses,
+            "validate_hit_rate": rate(self.validate_hits, self.validate_misses),
+        }
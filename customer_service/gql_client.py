@@ -1,43 +1,172 @@
+import os
+import asyncio
+import logging
 import httpx
+from coalescing import BatchLoader
+from upstream_cache import NotModified, UpstreamCache
 
-def fetch_products():
+PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://localhost:5001")
+INVENTORY_SERVICE_URL = os.getenv("INVENTORY_SERVICE_URL", "http://localhost:5003")
+
+# Shared connection pool for all upstream calls (keep-alive, bounded concurrency)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 5.0))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 2.0))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0))
+
+# Per-resolver response caches: fresh for *_TTL seconds, then served stale for
+# up to CACHE_STALE_TTL more while a background refresh revalidates them
+CACHE_TTL_PRODUCTS = float(os.getenv("CACHE_TTL_PRODUCTS", 30))
+CACHE_TTL_WAREHOUSES = float(os.getenv("CACHE_TTL_WAREHOUSES", 60))
+CACHE_TTL_INVENTORY = float(os.getenv("CACHE_TTL_INVENTORY", 5))
+CACHE_STALE_TTL = float(os.getenv("CACHE_STALE_TTL", 60))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1000))
+
+products_cache = UpstreamCache("products", CACHE_TTL_PRODUCTS, CACHE_STALE_TTL, 1)
+warehouses_cache = UpstreamCache("warehouses", CACHE_TTL_WAREHOUSES, CACHE_STALE_TTL, 1)
+inventory_by_product_cache = UpstreamCache(
+    "inventory_by_product", CACHE_TTL_INVENTORY, CACHE_STALE_TTL, CACHE_MAX_ENTRIES
+)
+inventory_by_warehouse_cache = UpstreamCache(
+    "inventory_by_warehouse", CACHE_TTL_INVENTORY, CACHE_STALE_TTL, CACHE_MAX_ENTRIES
+)
+# Tail product_service's change stream and drop the product cache on every
+# change, so CACHE_TTL_PRODUCTS can be long without serving outdated prices
+PRODUCT_CHANGES_WATCH = os.getenv("PRODUCT_CHANGES_WATCH", "true").lower() == "true"
+PRODUCT_CHANGES_WAIT = float(os.getenv("PRODUCT_CHANGES_WAIT", 25))
+PRODUCT_CHANGES_RETRY = float(os.getenv("PRODUCT_CHANGES_RETRY", 5))
+
+CACHES = (products_cache, warehouses_cache, inventory_by_product_cache, inventory_by_warehouse_cache)
+
+# getInventoryByProduct lookups from concurrent requests are collected for
+# COALESCE_WINDOW_MS and sent as one GET /inventory/products?ids=... call
+INVENTORY_BATCHING = os.getenv("INVENTORY_BATCHING", "true").lower() == "true"
+COALESCE_WINDOW_MS = float(os.getenv("COALESCE_WINDOW_MS", 2))
+COALESCE_MAX_BATCH = int(os.getenv("COALESCE_MAX_BATCH", 100))
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+async def close_client():
+    global _client
+    for cache in CACHES:
+        cache.cancel_refreshes()
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def watch_product_changes():
+    """Long-poll GET /products/changes and invalidate the product cache on events"""
+    url = f"{PRODUCT_SERVICE_URL}/products/changes"
+    after = None
+    while True:
+        try:
+            params = {"wait": PRODUCT_CHANGES_WAIT}
+            if after is not None:
+                params["after"] = after
+            response = await get_client().get(url, params=params, timeout=PRODUCT_CHANGES_WAIT + HTTP_TIMEOUT)
+            if response.status_code == 410:
+                # Missed events were pruned; start over from the current position
+                products_cache.invalidate()
+                after = None
+                continue
+            response.raise_for_status()
+            body = response.json()
+            if after is None or body["events"]:
+                # Also on (re)connect: changes may have happened while we were not watching
+                products_cache.invalidate()
+            after = body["last_seq"]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Product change stream unavailable: %s", e)
+            after = None
+            await asyncio.sleep(PRODUCT_CHANGES_RETRY)
+
+def cache_stats():
+    stats = {cache.name: cache.stats() for cache in CACHES}
+    stats["inventory_batching"] = inventory_loader.stats()
+    return stats
+
+async def _fetch_inventory_batch(product_ids):
+    response = await get_client().get(
+        f"{INVENTORY_SERVICE_URL}/inventory/products", params={"ids": product_ids}
+    )
+    response.raise_for_status()
+    return response.json()
+
+inventory_loader = BatchLoader(
+    _fetch_inventory_batch,
+    window=COALESCE_WINDOW_MS / 1000,
+    max_batch_size=COALESCE_MAX_BATCH,
+)
+
+def _batched_inventory(product_id):
+    async def fetch(_etag):
+        return (await inventory_loader.load(product_id)) or [], None
+    return fetch
+
+def _conditional_get(url):
+    """Build a cache fetcher for url that revalidates with If-None-Match"""
+    async def fetch(etag):
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await get_client().get(url, headers=headers)
+        if response.status_code == 304 and etag:
+            raise NotModified()
+        response.raise_for_status()
+        return response.json(), response.headers.get("ETag")
+    return fetch
+
+async def fetch_products():
     try:
-        response = httpx.get("http://localhost:5001/products")  # Updated product_service port
-        return response.json()
+        return await products_cache.get(
+            "all", _conditional_get(f"{PRODUCT_SERVICE_URL}/products")
+        )
     except Exception as e:
         print("Error fetching products:", e)
         return []
 
-def get_customer(customer_id):
-    # For now, we'll mock the customer data
-    # In a real application, this would fetch from a database
-    customers = {
-        1: {"id": 1, "name": "John Doe", "email": "john@example.com"},
-        2: {"id": 2, "name": "Jane Smith", "email": "jane@example.com"},
-        3: {"id": 3, "name": "Bob Johnson", "email": "bob@example.com"}
-    }
-    return customers.get(customer_id)
-
-def fetch_warehouses():
+async def fetch_warehouses():
     try:
-        response = httpx.get("http://localhost:5003/warehouses")
-        return response.json()
+        return await warehouses_cache.get(
+            "all", _conditional_get(f"{INVENTORY_SERVICE_URL}/warehouses")
+        )
     except Exception as e:
         print("Error fetching warehouses:", e)
         return []
 
-def fetch_inventory_by_product(product_id):
+async def fetch_inventory_by_product(product_id):
     try:
-        response = httpx.get(f"http://localhost:5003/inventory/product/{product_id}")
-        return response.json()
+        if INVENTORY_BATCHING:
+            fetch = _batched_inventory(product_id)
+        else:
+            fetch = _conditional_get(f"{INVENTORY_SERVICE_URL}/inventory/product/{product_id}")
+        return await inventory_by_product_cache.get(product_id, fetch)
     except Exception as e:
         print(f"Error fetching inventory for product {product_id}:", e)
         return []
 
-def fetch_inventory_by_warehouse(warehouse_id):
+async def fetch_inventory_by_warehouse(warehouse_id):
     try:
-        response = httpx.get(f"http://localhost:5003/inventory/warehouse/{warehouse_id}")
-        return response.json()
+        return await inventory_by_warehouse_cache.get(
+            warehouse_id,
+            _conditional_get(f"{INVENTORY_SERVICE_URL}/inventory/warehouse/{warehouse_id}")
+        )
     except Exception as e:
         print(f"Error fetching inventory for warehouse {warehouse_id}:", e)
-        return []
\ No newline at end of file
+        return []
@@ -0,0 +1,131 @@
+"""
+Load test for upstream request coalescing.
+
+    python load_test_coalescing.py --requests 2000 --concurrency 200 --products 500
+
+Starts a stub inventory upstream that counts calls, then fires concurrent
+getInventoryByProduct queries at the customer GraphQL app in-process, once
+with INVENTORY_BATCHING off (one upstream call per product) and once with it
+on. Response caching is disabled so only coalescing is measured.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+
+STUB_PORT = 18111
+
+os.environ["INVENTORY_SERVICE_URL"] = f"http://127.0.0.1:{STUB_PORT}"
+os.environ["CACHE_TTL_INVENTORY"] = "0"
+os.environ["CACHE_STALE_TTL"] = "0"
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/customers_load_test.db")
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+upstream_calls = {"single": 0, "bulk": 0, "bulk_keys": 0}
+UPSTREAM_LATENCY = 0.02
+
+
+def _inventory(product_id):
+    return [{"productId": product_id, "warehouseId": "WH1", "stock": 10, "updatedAt": "2024-01-01T00:00:00"}]
+
+
+async def single(request):
+    upstream_calls["single"] += 1
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return JSONResponse(_inventory(request.path_params["product_id"]))
+
+
+async def bulk(request):
+    ids = request.query_params.getlist("ids")
+    upstream_calls["bulk"] += 1
+    upstream_calls["bulk_keys"] += len(ids)
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return JSONResponse({product_id: _inventory(product_id) for product_id in ids})
+
+
+stub = Starlette(routes=[
+    Route("/inventory/product/{product_id}", single),
+    Route("/inventory/products", bulk),
+])
+
+
+def start_stub():
+    server = uvicorn.Server(uvicorn.Config(stub, port=STUB_PORT, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+QUERY = "query Stock($id: String!) { getInventoryByProduct(productId: $id) { stock } }"
+
+
+async def run(app, total, concurrency, products):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        async def one():
+            nonlocal errors
+            product_id = str(random.randint(1, products))
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/graphql", json={"query": QUERY, "variables": {"id": product_id}})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or response.json().get("errors"):
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(total / elapsed),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1),
+        "errors": errors,
+    }
+
+
+async def compare(app, args):
+    import gql_client
+
+    for batching in (False, True):
+        gql_client.INVENTORY_BATCHING = batching
+        gql_client.inventory_by_product_cache.clear()
+        for key in upstream_calls:
+            upstream_calls[key] = 0
+        result = await run(app, args.requests, args.concurrency, args.products)
+        calls = upstream_calls["single"] + upstream_calls["bulk"]
+        label = "batched" if batching else "unbatched"
+        print(f"{label:<10} upstream calls {calls:5d}  ({upstream_calls['bulk_keys']} keys in bulk calls)  {result}")
+
+    print("loader", gql_client.inventory_loader.stats())
+    print("cache single-flight", gql_client.inventory_by_product_cache.stats()["coalesced"])
+    await gql_client.close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure upstream calls saved by coalescing")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--products", type=int, default=500, help="size of the product id pool")
+    args = parser.parse_args()
+
+    start_stub()
+    from app import app
+    asyncio.run(compare(app, args))
+
+
+if __name__ == "__main__":
+    main()
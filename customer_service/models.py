@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from database import Base
+
+
+class Customer(Base):
+    __tablename__ = "customers"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    # Stored lower-cased so lookups by email can use the unique index directly
+    email = Column(String(255), nullable=False, unique=True, index=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<Customer(id={self.id}, email='{self.email}')>"
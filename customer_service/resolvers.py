@@ -1,27 +1,75 @@
+import asyncio
+import os
+from functools import wraps
 from ariadne import QueryType
-from gql_client import fetch_products, get_customer, fetch_warehouses, fetch_inventory_by_product, fetch_inventory_by_warehouse
+from graphql import GraphQLError
+from customers import get_customer, get_customer_by_email, get_customers, list_customers, MAX_BATCH_SIZE
+from gql_client import fetch_products, fetch_warehouses, fetch_inventory_by_product, fetch_inventory_by_warehouse
+
+# Upper bound for each upstream-backed root field. Root fields run concurrently,
+# so a query takes max() of its upstreams; a slow one is cut off and returned as
+# null with an error while the other fields still resolve.
+FIELD_TIMEOUT = float(os.getenv("FIELD_TIMEOUT", 3.0))
 
 query = QueryType()
 
+def with_timeout(seconds=None):
+    def decorator(resolver):
+        @wraps(resolver)
+        async def wrapper(obj, info, **kwargs):
+            timeout = seconds if seconds is not None else FIELD_TIMEOUT
+            try:
+                return await asyncio.wait_for(resolver(obj, info, **kwargs), timeout)
+            except asyncio.TimeoutError:
+                raise GraphQLError(
+                    f"{info.field_name} timed out after {timeout}s",
+                    extensions={"code": "UPSTREAM_TIMEOUT"}
+                ) from None
+        return wrapper
+    return decorator
+
 @query.field("getProducts")
-def resolve_get_products(_, info):
-    return fetch_products()
+@with_timeout()
+async def resolve_get_products(_, info):
+    return await fetch_products()
 
+# Customer lookups hit local indexes and stay synchronous; they finish in
+# microseconds, well below the cost of a thread-pool hop.
 @query.field("getCustomer")
 def resolve_get_customer(_, info, id):
     return get_customer(id)
 
+@query.field("getCustomerByEmail")
+def resolve_get_customer_by_email(_, info, email):
+    return get_customer_by_email(email)
+
+@query.field("getCustomers")
+def resolve_get_customers(_, info, ids):
+    if len(ids) > MAX_BATCH_SIZE:
+        raise GraphQLError(f"getCustomers accepts at most {MAX_BATCH_SIZE} ids")
+    return get_customers(ids)
+
+@query.field("customers")
+def resolve_customers(_, info, first=None, after=None):
+    try:
+        return list_customers(first, after)
+    except ValueError as e:
+        raise GraphQLError(str(e))
+
 @query.field("getWarehouses")
-def resolve_get_warehouses(_, info):
-    return fetch_warehouses()
+@with_timeout()
+async def resolve_get_warehouses(_, info):
+    return await fetch_warehouses()
 
 @query.field("getInventoryByProduct")
-def resolve_get_inventory_by_product(_, info, productId):
-    return fetch_inventory_by_product(productId)
+@with_timeout()
+async def resolve_get_inventory_by_product(_, info, productId):
+    return await fetch_inventory_by_product(productId)
 
 @query.field("getInventoryByWarehouse")
-def resolve_get_inventory_by_warehouse(_, info, warehouseId):
-    return fetch_inventory_by_warehouse(warehouseId)
+@with_timeout()
+async def resolve_get_inventory_by_warehouse(_, info, warehouseId):
+    return await fetch_inventory_by_warehouse(warehouseId)
 
 # @query.field("getOrders")
 # def resolve_get_orders(_, info, userId):
@@ -0,0 +1,78 @@
+"""
+Seed or bulk-load the customer store.
+
+    python seed.py --count 1000000              # synthetic customers
+    python seed.py --csv customers.csv          # name,email[,id] with a header row
+
+Rows are inserted in batches inside one transaction per batch; existing
+emails are not checked up front, so re-running a CSV load fails on the
+unique email index rather than creating duplicates.
+"""
+import argparse
+import csv
+import time
+from sqlalchemy import func, insert, select
+from database import engine
+from models import Customer
+from customers import init_db
+
+BATCH_SIZE = 10000
+
+
+def _insert_batches(rows, batch_size=BATCH_SIZE):
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += _insert(batch)
+            batch = []
+    if batch:
+        total += _insert(batch)
+    return total
+
+
+def _insert(batch):
+    with engine.begin() as conn:
+        conn.execute(insert(Customer), batch)
+    return len(batch)
+
+
+def synthetic_customers(count):
+    with engine.connect() as conn:
+        start = (conn.execute(select(func.max(Customer.id))).scalar() or 0) + 1
+    for customer_id in range(start, start + count):
+        yield {
+            "id": customer_id,
+            "name": f"Customer {customer_id}",
+            "email": f"customer{customer_id}@example.com",
+        }
+
+
+def csv_customers(path):
+    with open(path, newline="") as f:
+        for record in csv.DictReader(f):
+            row = {"name": record["name"], "email": record["email"].strip().lower()}
+            if record.get("id"):
+                row["id"] = int(record["id"])
+            yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the customer store")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--count", type=int, help="number of synthetic customers to add")
+    source.add_argument("--csv", help="CSV file with name,email[,id] columns")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    rows = synthetic_customers(args.count) if args.count else csv_customers(args.csv)
+    start = time.perf_counter()
+    inserted = _insert_batches(rows, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Inserted {inserted} customers in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Production entry point: the app under multi-worker uvicorn.
+
+    python serve.py
+
+The customers table is created and seeded once here, before the workers
+start, so workers never race to seed an empty store. Each worker is a
+separate process with its own event loop, upstream caches and product
+change watcher.
+
+Environment Variables:
+PORT                 - Listen port (default: 5000)
+WEB_CONCURRENCY      - Worker processes (default: one per CPU, at most UVICORN_MAX_WORKERS)
+UVICORN_MAX_WORKERS  - Cap for the derived worker count (default: 8)
+UVICORN_KEEPALIVE    - Seconds an idle keep-alive connection stays open (default: 5)
+"""
+import os
+import uvicorn
+from eai_common.workers import uvicorn_workers
+from customers import init_db
+
+
+if __name__ == '__main__':
+    init_db()
+    uvicorn.run(
+        'app:app',
+        host='0.0.0.0',
+        port=int(os.getenv('PORT', 5000)),
+        workers=uvicorn_workers(),
+        timeout_keep_alive=int(os.getenv('UVICORN_KEEPALIVE', 5)),
+        proxy_headers=True,
+    )
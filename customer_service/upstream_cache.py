@@ -0,0 +1,152 @@
+"""
+In-memory cache for upstream REST responses.
+
+Each resolver gets its own ``UpstreamCache`` with a TTL and an LRU bound.
+Within the TTL an entry is served straight from memory. For ``stale_ttl``
+after that it is still served, while one background task refreshes it
+(stale-while-revalidate). Refreshes send ``If-None-Match`` when the upstream
+gave an ETag, so an unchanged resource costs a 304 and no body. If a refresh
+fails, the last good value keeps being served until the stale window ends.
+Concurrent misses for the same key share one upstream call (single-flight).
+``invalidate()`` drops everything at once when the upstream announces a
+change, so TTLs can be long without serving outdated data.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class NotModified(Exception):
+    """Raised by a fetcher when the upstream answered 304 for the given ETag"""
+
+
+class _Entry:
+    __slots__ = ("value", "etag", "fetched_at")
+
+    def __init__(self, value, etag, fetched_at):
+        self.value = value
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+
+class UpstreamCache:
+    def __init__(self, name, ttl, stale_ttl, maxsize):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        # key -> task fetching it; shared by concurrent misses and refreshes
+        self.inflight = {}
+        # Bumped by invalidate(); fetches started before it do not store
+        self.generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get(self, key, fetch):
+        """
+        Return the cached value for ``key``, calling ``fetch(etag)`` when needed.
+
+        ``fetch`` returns ``(value, etag)`` or raises ``NotModified``; any other
+        exception propagates when there is nothing cached to fall back on.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self.entries.move_to_end(key)
+                self._refresh_in_background(key, fetch)
+                return entry.value
+        self.misses += 1
+        if key in self.inflight:
+            self.coalesced += 1
+        # Shielded so a caller that times out does not cancel the shared fetch
+        return await asyncio.shield(self._start_refresh(key, fetch))
+
+    def _start_refresh(self, key, fetch):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(key, fetch))
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._finish_refresh(key, t))
+        return task
+
+    def _finish_refresh(self, key, task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    async def _refresh(self, key, fetch):
+        entry = self.entries.get(key)
+        generation = self.generation
+        try:
+            value, etag = await fetch(entry.etag if entry else None)
+        except NotModified:
+            self.revalidated += 1
+            if generation == self.generation:
+                entry.fetched_at = time.monotonic()
+            return entry.value
+        if generation == self.generation:
+            self._store(key, _Entry(value, etag, time.monotonic()))
+        return value
+
+    def _refresh_in_background(self, key, fetch):
+        if key in self.inflight:
+            return
+        task = self._start_refresh(key, fetch)
+        task.add_done_callback(lambda t: self._log_failed_refresh(key, t))
+
+    def _log_failed_refresh(self, key, task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background refresh of %s %r failed: %s", self.name, key, task.exception())
+
+    def _store(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def cancel_refreshes(self):
+        for task in list(self.inflight.values()):
+            task.cancel()
+
+    def clear(self):
+        self.entries.clear()
+
+    def invalidate(self):
+        """Drop all entries; fetches already in flight will not repopulate them"""
+        self.generation += 1
+        self.invalidations += 1
+        self.entries.clear()
+        self.inflight.clear()
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "fetch_errors": self.errors,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+        }
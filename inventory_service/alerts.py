@@ -0,0 +1,129 @@
+"""
+Low-stock threshold crossings.
+
+Stock mutations call ``notify_threshold_crossing`` inside their transaction;
+it issues a Postgres NOTIFY only when a row moves across its reorder point,
+so the notification is delivered on commit and dropped on rollback. Bulk
+imports find their crossings in the merge statement and send them all with
+``publish_events`` in the same way. Each
+worker keeps one LISTEN connection and fans events out to its local
+subscribers (SSE clients and GraphQL subscriptions).
+"""
+import asyncio
+import json
+import asyncpg
+from database import database, DATABASE_URL
+
+CHANNEL = "inventory_low_stock"
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def threshold_crossing(previous_stock, stock, reorder_point):
+    """Return "LOW", "RECOVERED" or None for a stock change against a reorder point"""
+    if reorder_point is None:
+        return None
+    was_low = previous_stock is not None and previous_stock < reorder_point
+    is_low = stock < reorder_point
+    if is_low and not was_low:
+        return "LOW"
+    if was_low and not is_low:
+        return "RECOVERED"
+    return None
+
+
+async def _publish(event):
+    await database.execute(
+        query="SELECT pg_notify(:channel, :payload)",
+        values={"channel": CHANNEL, "payload": json.dumps(event)},
+    )
+    return event
+
+
+def crossing_event(product_id, warehouse_id, previous_stock, stock, reorder_point):
+    """Build the event for a stock change, or None if it does not cross the reorder point"""
+    state = threshold_crossing(previous_stock, stock, reorder_point)
+    if state is None:
+        return None
+    return {
+        "product_id": product_id,
+        "warehouse_id": warehouse_id,
+        "state": state,
+        "stock": stock,
+        "previous_stock": previous_stock,
+        "reorder_point": reorder_point,
+    }
+
+
+async def publish_events(raw, events):
+    """NOTIFY many events in one round trip on an asyncpg connection (inside its transaction)"""
+    if events:
+        await raw.execute(
+            "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload",
+            CHANNEL, [json.dumps(event) for event in events],
+        )
+
+
+async def notify_threshold_crossing(product_id, warehouse_id, previous_stock, stock, reorder_point):
+    """Publish a crossing event if a stock change moves the row across its reorder point"""
+    event = crossing_event(product_id, warehouse_id, previous_stock, stock, reorder_point)
+    if event is None:
+        return None
+    return await _publish(event)
+
+
+async def notify_reorder_point_change(product_id, warehouse_id, stock, previous_reorder_point, reorder_point):
+    """Publish a crossing event if moving the threshold puts the row on the other side of it"""
+    was_low = previous_reorder_point is not None and stock < previous_reorder_point
+    is_low = reorder_point is not None and stock < reorder_point
+    if was_low == is_low:
+        return None
+    return await _publish({
+        "product_id": product_id,
+        "warehouse_id": warehouse_id,
+        "state": "LOW" if is_low else "RECOVERED",
+        "stock": stock,
+        "previous_stock": stock,
+        "reorder_point": reorder_point,
+    })
+
+
+class LowStockBroker:
+    """Fan out NOTIFY events from one LISTEN connection to in-process subscribers"""
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.connection = None
+        self.subscribers = set()
+
+    async def start(self):
+        self.connection = await asyncpg.connect(self.dsn)
+        await self.connection.add_listener(CHANNEL, self._on_notify)
+
+    async def stop(self):
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        event = json.loads(payload)
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer; drop rather than grow without bound
+                pass
+
+    async def subscribe(self, warehouse_id=None):
+        """Yield crossing events, optionally only for one warehouse"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if warehouse_id is None or event["warehouse_id"] == warehouse_id:
+                    yield event
+        finally:
+            self.subscribers.discard(queue)
+
+
+broker = LowStockBroker(DATABASE_URL)
@@ -2,34 +2,55 @@ import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from strawberry.fastapi import GraphQLRouter
 import strawberry
-from database import database, engine
-from models import Base
-from schema import Query, Mutation
+from strawberry.extensions import QueryDepthLimiter, ParserCache, ValidationCache
+from database import database, pool_metrics
+from alerts import broker
+from schema import Query, Mutation, Subscription
+from graphql_extensions import (
+    MAX_QUERY_DEPTH,
+    DOCUMENT_CACHE_SIZE,
+    ComplexityLimiter,
+    OperationTimer,
+    PersistedQueryRouter,
+    persisted_queries,
+    operation_stats,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle events"""
     # Startup
+    # Tables are created by migrate.py, not here
     await database.connect()
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    print("Database connected and tables created")
+    await broker.start()
+    print("Database connected")
     
     yield
     
     # Shutdown
+    await broker.stop()
     await database.disconnect()
     print("Database disconnected")
 
 
 # Create GraphQL schema
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    extensions=[
+        OperationTimer,
+        QueryDepthLimiter(max_depth=MAX_QUERY_DEPTH),
+        ComplexityLimiter(),
+        ParserCache(maxsize=DOCUMENT_CACHE_SIZE),
+        ValidationCache(maxsize=DOCUMENT_CACHE_SIZE),
+    ]
+)
 
-# Create GraphQL router
-graphql_app = GraphQLRouter(schema)
+# Create GraphQL router (with Automatic Persisted Query support)
+graphql_app = PersistedQueryRouter(schema)
 
 # Create FastAPI app
 app = FastAPI(
@@ -68,6 +89,17 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics/db")
+async def db_metrics():
+    return pool_metrics()
+
+@app.get("/metrics/graphql")
+async def graphql_metrics():
+    return {
+        "operations": operation_stats.snapshot(),
+        "persisted_queries": persisted_queries.stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 5003))
@@ -0,0 +1,241 @@
+"""
+Bulk inventory import/export.
+
+Imports stream the request body into a temporary staging table with Postgres
+COPY and merge it into ``inventory`` with a single INSERT ... ON CONFLICT.
+The merge also reports rows whose stock crossed their reorder point, which
+are published as low-stock events in the same transaction (see alerts.py).
+Exports stream ``COPY ... TO STDOUT`` (CSV) or a server-side cursor (NDJSON)
+straight into the HTTP response.
+"""
+import asyncio
+import json
+from database import database
+from alerts import crossing_event, publish_events
+
+STAGING_TABLE = "inventory_staging"
+STAGING_COLUMNS = ("product_id", "warehouse_id", "stock")
+NDJSON_BATCH_SIZE = 5000
+
+CREATE_STAGING = f"""
+    CREATE TEMP TABLE {STAGING_TABLE} (
+        seq BIGSERIAL,
+        product_id TEXT,
+        warehouse_id TEXT,
+        stock INTEGER
+    ) ON COMMIT DROP
+"""
+
+# Last row wins for duplicate keys; rows with negative stock or an unknown
+# warehouse are skipped instead of aborting the whole load. All CTEs read the
+# same snapshot, so ``previous`` holds the stock from before the merge. Returns
+# one row: the merged row count and the rows that crossed their reorder point.
+MERGE_STAGING = f"""
+    WITH incoming AS (
+        SELECT DISTINCT ON (s.product_id, s.warehouse_id)
+               s.product_id, s.warehouse_id, s.stock
+        FROM {STAGING_TABLE} s
+        JOIN warehouses w ON w.id = s.warehouse_id
+        WHERE s.product_id IS NOT NULL AND s.stock >= 0
+        ORDER BY s.product_id, s.warehouse_id, s.seq DESC
+    ),
+    previous AS (
+        SELECT i.product_id, i.warehouse_id, i.stock
+        FROM inventory i
+        JOIN incoming n ON n.product_id = i.product_id AND n.warehouse_id = i.warehouse_id
+    ),
+    merged AS (
+        INSERT INTO inventory (product_id, warehouse_id, stock, updated_at)
+        SELECT product_id, warehouse_id, stock, now() FROM incoming
+        ON CONFLICT (product_id, warehouse_id)
+        DO UPDATE SET stock = EXCLUDED.stock, updated_at = EXCLUDED.updated_at
+        RETURNING product_id, warehouse_id, stock, reorder_point
+    )
+    SELECT
+        (SELECT count(*) FROM merged) AS upserted,
+        (
+            SELECT coalesce(json_agg(json_build_object(
+                'product_id', m.product_id,
+                'warehouse_id', m.warehouse_id,
+                'previous_stock', p.stock,
+                'stock', m.stock,
+                'reorder_point', m.reorder_point
+            )), '[]')
+            FROM merged m
+            LEFT JOIN previous p ON p.product_id = m.product_id AND p.warehouse_id = m.warehouse_id
+            WHERE m.reorder_point IS NOT NULL
+              AND coalesce(p.stock < m.reorder_point, false) <> (m.stock < m.reorder_point)
+        ) AS crossings
+"""
+
+# Full resync: drop rows for the imported warehouses that the file no longer lists
+PRUNE_MISSING = f"""
+    DELETE FROM inventory i
+    WHERE i.warehouse_id IN (SELECT DISTINCT warehouse_id FROM {STAGING_TABLE})
+      AND NOT EXISTS (
+          SELECT 1 FROM {STAGING_TABLE} s
+          WHERE s.product_id = i.product_id AND s.warehouse_id = i.warehouse_id
+      )
+"""
+
+EXPORT_COLUMNS = "product_id, warehouse_id, stock, updated_at"
+
+
+def _rowcount(status):
+    """Extract the row count from an asyncpg status string such as 'INSERT 0 42'"""
+    try:
+        return int(status.split()[-1])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+async def _ndjson_records(chunks):
+    """Turn a byte stream of NDJSON lines into batches of staging records"""
+    buffer = b""
+    batch = []
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                batch.append(_ndjson_record(line, number))
+            if len(batch) >= NDJSON_BATCH_SIZE:
+                yield batch
+                batch = []
+    if buffer.strip():
+        batch.append(_ndjson_record(buffer, number + 1))
+    if batch:
+        yield batch
+
+
+def _ndjson_record(line, number):
+    """Staging record for one NDJSON line; ValueError naming the line if it is not a valid record"""
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"line {number}: invalid JSON: {e}")
+    if not isinstance(item, dict):
+        raise ValueError(f"line {number}: expected an object with product_id, warehouse_id and stock")
+    try:
+        return (str(item["product_id"]), str(item["warehouse_id"]), int(item["stock"]))
+    except KeyError as e:
+        raise ValueError(f"line {number}: missing {e}")
+    except (TypeError, ValueError):
+        raise ValueError(f"line {number}: stock must be an integer")
+
+
+async def import_inventory(chunks, fmt="csv", header=True, prune=False):
+    """
+    Load (product_id, warehouse_id, stock) rows from an async byte stream.
+
+    Stock values are absolute, not deltas. Rows that cross their reorder
+    point publish a low-stock event, delivered on commit. Returns counts of
+    staged, upserted, skipped, (with ``prune``) deleted rows and of the
+    crossings notified.
+    """
+    async with database.connection() as connection:
+        raw = connection.raw_connection
+        async with connection.transaction():
+            await raw.execute(CREATE_STAGING)
+
+            if fmt == "csv":
+                await raw.copy_to_table(
+                    STAGING_TABLE,
+                    source=chunks,
+                    columns=STAGING_COLUMNS,
+                    format="csv",
+                    header=header,
+                )
+            elif fmt == "ndjson":
+                async for batch in _ndjson_records(chunks):
+                    await raw.copy_records_to_table(
+                        STAGING_TABLE, records=batch, columns=STAGING_COLUMNS
+                    )
+            else:
+                raise ValueError(f"Unsupported import format: {fmt}")
+
+            staged = await raw.fetchval(f"SELECT count(*) FROM {STAGING_TABLE}")
+            merge = await raw.fetchrow(MERGE_STAGING)
+            upserted = merge["upserted"]
+            # The merge pre-filters crossings; crossing_event() builds the same events as update_stock
+            events = [crossing_event(**row) for row in json.loads(merge["crossings"])]
+            events = [event for event in events if event is not None]
+            await publish_events(raw, events)
+            deleted = _rowcount(await raw.execute(PRUNE_MISSING)) if prune else 0
+
+    return {
+        "staged": staged,
+        "upserted": upserted,
+        "skipped": staged - upserted,
+        "deleted": deleted,
+        "notified": len(events),
+    }
+
+
+async def export_inventory_csv(warehouse_id=None):
+    """Yield the inventory table as CSV chunks produced by COPY TO STDOUT"""
+    queue = asyncio.Queue(maxsize=64)
+    done = object()
+
+    async with database.connection() as connection:
+        raw = connection.raw_connection
+        query = f"SELECT {EXPORT_COLUMNS} FROM inventory"
+        args = ()
+        if warehouse_id is not None:
+            query += " WHERE warehouse_id = $1"
+            args = (warehouse_id,)
+        query += " ORDER BY warehouse_id, product_id"
+
+        async def write(data):
+            # asyncpg hands out buffers it may reuse; copy before queueing
+            await queue.put(bytes(data))
+
+        async def produce():
+            try:
+                await raw.copy_from_query(
+                    query, *args, output=write, format="csv", header=True
+                )
+            except Exception as e:
+                await queue.put(e)
+            else:
+                await queue.put(done)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is done:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+
+async def export_inventory_ndjson(warehouse_id=None):
+    """Yield the inventory table as NDJSON, one row per line"""
+    query = f"SELECT {EXPORT_COLUMNS} FROM inventory"
+    values = {}
+    if warehouse_id is not None:
+        query += " WHERE warehouse_id = :warehouse_id"
+        values["warehouse_id"] = warehouse_id
+    query += " ORDER BY warehouse_id, product_id"
+
+    lines = []
+    async for row in database.iterate(query=query, values=values):
+        lines.append(json.dumps({
+            "product_id": row["product_id"],
+            "warehouse_id": row["warehouse_id"],
+            "stock": row["stock"],
+            "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+        }))
+        if len(lines) >= NDJSON_BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
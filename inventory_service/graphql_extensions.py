@@ -0,0 +1,218 @@
+"""
+GraphQL guard rails and instrumentation for the inventory service.
+
+- ``ComplexityLimiter`` rejects operations whose estimated row fan-out is too
+  large (nested warehouse -> inventory -> warehouse ... chains).
+- ``PersistedQueryRouter`` resolves Automatic Persisted Queries through the
+  shared ``PersistedQueryStore``; together with strawberry's ParserCache and
+  ValidationCache a repeated hash skips parse and validate entirely.
+- ``OperationTimer`` records parse/validate/execute timings per operation.
+"""
+import json
+import os
+import time
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+)
+from graphql.validation import ValidationRule
+from strawberry.extensions import AddValidationRules, SchemaExtension
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http.exceptions import HTTPException
+from strawberry.types import ExecutionResult
+from eai_common.persisted_queries import PersistedQueryNotFound, PersistedQueryStore
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+MAX_QUERY_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", 8))
+MAX_QUERY_COMPLEXITY = int(os.getenv("GRAPHQL_MAX_COMPLEXITY", 20000))
+# Assumed size of list fields that cannot be paged (e.g. getAllWarehouses)
+LIST_FANOUT = int(os.getenv("GRAPHQL_LIST_FANOUT", 20))
+PERSISTED_QUERY_CACHE_SIZE = int(os.getenv("GRAPHQL_PERSISTED_QUERY_CACHE_SIZE", 1000))
+PERSISTED_QUERIES_FILE = os.getenv("GRAPHQL_PERSISTED_QUERIES_FILE")
+DOCUMENT_CACHE_SIZE = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", 1000))
+
+
+def _field_fanout(parent_type, field_node, field_def):
+    """Estimate how many child rows one resolution of this field produces"""
+    if parent_type.name.endswith("Connection"):
+        # edges/pageInfo: the page size was already charged on the connection field
+        return 1
+    for argument in field_node.arguments:
+        if argument.name.value == "first":
+            value = argument.value
+            if isinstance(value, IntValueNode):
+                return min(int(value.value), MAX_PAGE_SIZE)
+            if isinstance(value, VariableNode):
+                # Unknown at validation time; assume the largest page
+                return MAX_PAGE_SIZE
+    if "first" in field_def.args:
+        return DEFAULT_PAGE_SIZE
+    if is_list_type(get_nullable_type(field_def.type)):
+        return LIST_FANOUT
+    return 1
+
+
+class ComplexityLimitRule(ValidationRule):
+    """Sum of fields resolved, each weighted by the fan-out of its ancestors"""
+
+    def enter_operation_definition(self, node, *_args):
+        schema = self.context.schema
+        root = schema.get_root_type(node.operation)
+        if root is None:
+            return
+        cost = self._selection_cost(node.selection_set, root, 1, set())
+        if cost > MAX_QUERY_COMPLEXITY:
+            name = node.name.value if node.name else "anonymous"
+            self.report_error(GraphQLError(
+                f"'{name}' has an estimated complexity of {cost}, "
+                f"which exceeds the maximum of {MAX_QUERY_COMPLEXITY}",
+                node,
+            ))
+
+    def _selection_cost(self, selection_set, parent_type, multiplier, visited):
+        if selection_set is None:
+            return 0
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_def = getattr(parent_type, "fields", {}).get(selection.name.value)
+                if field_def is None:
+                    continue  # __typename or unknown; other rules report the latter
+                cost += multiplier
+                child_multiplier = multiplier * _field_fanout(parent_type, selection, field_def)
+                cost += self._selection_cost(
+                    selection.selection_set, get_named_type(field_def.type), child_multiplier, visited
+                )
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.context.schema.get_type(selection.type_condition.name.value)
+                cost += self._selection_cost(selection.selection_set, fragment_type, multiplier, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.context.get_fragment(name)
+                if fragment is None or name in visited:
+                    continue  # cycles are reported by NoFragmentCyclesRule
+                fragment_type = self.context.schema.get_type(fragment.type_condition.name.value)
+                cost += self._selection_cost(
+                    fragment.selection_set, fragment_type, multiplier, visited | {name}
+                )
+        return cost
+
+
+class ComplexityLimiter(AddValidationRules):
+    def __init__(self):
+        super().__init__([ComplexityLimitRule])
+
+
+persisted_queries = PersistedQueryStore(PERSISTED_QUERY_CACHE_SIZE)
+if PERSISTED_QUERIES_FILE:
+    persisted_queries.load_manifest(PERSISTED_QUERIES_FILE)
+
+
+class PersistedQueryRouter(GraphQLRouter):
+    """
+    GraphQLRouter that understands Automatic Persisted Queries.
+
+    Clients send ``extensions.persistedQuery.sha256Hash`` and may omit the
+    query text; an unknown hash answers PersistedQueryNotFound so the client
+    can retry once with the full query, which is then remembered.
+    """
+
+    async def parse_http_body(self, request):
+        request_data = await super().parse_http_body(request)
+        persisted = (await self._request_extensions(request)).get("persistedQuery")
+        if persisted:
+            try:
+                request_data.query = persisted_queries.resolve(
+                    persisted["sha256Hash"], request_data.query
+                )
+            except (KeyError, ValueError) as e:
+                raise HTTPException(400, f"Invalid persisted query: {e}")
+        return request_data
+
+    async def _request_extensions(self, request):
+        if request.method == "GET":
+            extensions = request.query_params.get("extensions")
+            return json.loads(extensions) if extensions else {}
+        if "application/json" in (request.content_type or ""):
+            return self.parse_json(await request.get_body()).get("extensions") or {}
+        return {}
+
+    async def execute_operation(self, request, context, root_value):
+        try:
+            return await super().execute_operation(request, context, root_value)
+        except PersistedQueryNotFound:
+            return ExecutionResult(data=None, errors=[GraphQLError(
+                "PersistedQueryNotFound",
+                extensions={"code": "PERSISTED_QUERY_NOT_FOUND"},
+            )])
+
+
+class OperationStats:
+    """Aggregated timings per operation name"""
+
+    def __init__(self):
+        self.operations = {}
+
+    def record(self, name, timings):
+        entry = self.operations.setdefault(name, {
+            "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "parse_ms": 0.0, "validate_ms": 0.0, "execute_ms": 0.0,
+        })
+        entry["count"] += 1
+        entry["total_ms"] += timings["total_ms"]
+        entry["max_ms"] = max(entry["max_ms"], timings["total_ms"])
+        for phase in ("parse_ms", "validate_ms", "execute_ms"):
+            entry[phase] += timings.get(phase, 0.0)
+        if timings.get("error"):
+            entry["errors"] += 1
+
+    def snapshot(self):
+        return {
+            name: dict(entry, avg_ms=round(entry["total_ms"] / entry["count"], 3))
+            for name, entry in self.operations.items()
+        }
+
+
+operation_stats = OperationStats()
+
+
+class OperationTimer(SchemaExtension):
+    """Time each phase of an operation and report it in response extensions"""
+
+    def __init__(self, *, execution_context=None):
+        self.execution_context = execution_context
+        self.timings = {}
+
+    def _timed(self, phase):
+        start = time.perf_counter()
+        yield
+        self.timings[phase] = round((time.perf_counter() - start) * 1000, 3)
+
+    def on_parse(self):
+        yield from self._timed("parse_ms")
+
+    def on_validate(self):
+        yield from self._timed("validate_ms")
+
+    def on_execute(self):
+        yield from self._timed("execute_ms")
+
+    def on_operation(self):
+        start = time.perf_counter()
+        yield
+        self.timings["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        self.timings["error"] = bool(self.execution_context.errors)
+        name = self.execution_context.operation_name or "anonymous"
+        operation_stats.record(name, self.timings)
+
+    def get_results(self):
+        return {"timing": {k: v for k, v in self.timings.items() if k != "error"}}
@@ -0,0 +1,52 @@
+"""
+Schema migration step for the inventory service.
+
+Run once per deploy, before the API processes start:
+
+    python migrate.py
+
+Table creation used to run synchronously inside the FastAPI lifespan; it now
+lives here so the request-serving event loop never blocks on DDL.
+"""
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from database import DATABASE_URL, Base
+import models  # noqa: F401  (registers tables on Base.metadata)
+
+
+def _async_url(url):
+    """Point a plain postgresql:// URL at the asyncpg driver"""
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    return url
+
+
+# Idempotent changes for databases created before a column existed
+UPGRADES = [
+    "ALTER TABLE inventory ADD COLUMN IF NOT EXISTS reorder_point INTEGER",
+]
+
+
+def _create_schema(conn):
+    Base.metadata.create_all(conn)
+    for statement in UPGRADES:
+        conn.execute(text(statement))
+    # create_all skips indexes on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+async def migrate():
+    engine = create_async_engine(_async_url(DATABASE_URL))
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(_create_schema)
+    finally:
+        await engine.dispose()
+    print("Database tables created")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -27,10 +27,24 @@ class Inventory(Base):
     product_id = Column(String, primary_key=True, nullable=False)
     warehouse_id = Column(String, ForeignKey("warehouses.id"), primary_key=True, nullable=False)
     stock = Column(Integer, nullable=False, default=0)
+    reorder_point = Column(Integer, nullable=True)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationship
     warehouse = relationship("Warehouse", back_populates="inventory_items")
+
+    __table_args__ = (
+        # Keyset pagination of a warehouse's inventory by product_id
+        Index("ix_inventory_warehouse_product", "warehouse_id", "product_id"),
+        # Low-stock filters within a warehouse
+        Index("ix_inventory_warehouse_stock", "warehouse_id", "stock"),
+        # Rows currently below their reorder point; Postgres keeps this
+        # partial index up to date on every stock write
+        Index(
+            "ix_inventory_low_stock", "warehouse_id", "product_id",
+            postgresql_where=text("stock < reorder_point")
+        ),
+    )
     
     def __repr__(self):
-        return f"<Inventory(product_id='{self.product_id}', warehouse_id='{self.warehouse_id}', stock={self.stock})>"
\ No newline at end of file
+        return f"<Inventory(product_id='{self.product_id}', warehouse_id='{self.warehouse_id}', stock={self.stock}, reorder_point={self.reorder_point})>"
\ No newline at end of file
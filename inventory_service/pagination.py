@@ -0,0 +1,86 @@
+"""
+Keyset (cursor) pagination helpers shared by the GraphQL and REST layers.
+
+Within a warehouse, inventory rows are ordered by ``product_id``; a cursor is
+the opaque, base64-encoded ``product_id`` of the last row on a page. Listings
+that span warehouses use a composite (warehouse_id, product_id) cursor.
+"""
+import base64
+import binascii
+import json
+from sqlalchemy import select, tuple_
+from models import Inventory as InventoryModel
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(product_id):
+    return base64.urlsafe_b64encode(product_id.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return base64.b64decode(cursor.encode(), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def encode_key_cursor(*key):
+    """Encode a composite sort key, e.g. (warehouse_id, product_id)"""
+    return encode_cursor(json.dumps(list(key)))
+
+
+def decode_key_cursor(cursor, size):
+    try:
+        key = json.loads(decode_cursor(cursor))
+    except json.JSONDecodeError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key
+
+
+def clamp_page_size(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def warehouse_inventory_page_query(warehouse_id, limit, after=None, stock_below=None):
+    """
+    Build a keyset query for one page of a warehouse's inventory.
+
+    Selects ``limit + 1`` rows so callers can tell whether another page exists;
+    with ``limit`` None, every row. Backed by the (warehouse_id, product_id)
+    and (warehouse_id, stock) indexes.
+    """
+    query = select(InventoryModel).where(InventoryModel.warehouse_id == warehouse_id)
+    if after is not None:
+        query = query.where(InventoryModel.product_id > decode_cursor(after))
+    if stock_below is not None:
+        query = query.where(InventoryModel.stock < stock_below)
+    query = query.order_by(InventoryModel.product_id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def low_stock_page_query(limit, warehouse_id=None, after=None):
+    """
+    Build a keyset query for rows below their reorder point.
+
+    The ``stock < reorder_point`` predicate matches the partial
+    ix_inventory_low_stock index, so only low rows are ever read.
+    """
+    query = select(InventoryModel).where(InventoryModel.stock < InventoryModel.reorder_point)
+    if warehouse_id is not None:
+        query = query.where(InventoryModel.warehouse_id == warehouse_id)
+    if after is not None:
+        key = decode_key_cursor(after, 2)
+        query = query.where(
+            tuple_(InventoryModel.warehouse_id, InventoryModel.product_id) > tuple_(*key)
+        )
+    return query.order_by(InventoryModel.warehouse_id, InventoryModel.product_id).limit(limit + 1)
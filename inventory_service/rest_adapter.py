@@ -1,13 +1,28 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy import select
+import asyncpg
 from database import database
+from bulk import import_inventory, export_inventory_csv, export_inventory_ndjson
+from pagination import (
+    encode_cursor,
+    encode_key_cursor,
+    clamp_page_size,
+    warehouse_inventory_page_query,
+    low_stock_page_query,
+)
+from alerts import broker, notify_threshold_crossing, notify_reorder_point_change
+import json
 from models import Warehouse as WarehouseModel, Inventory as InventoryModel
 from datetime import datetime
 
 router = APIRouter()
 
+# Upper bound on product IDs per bulk lookup
+MAX_BULK_PRODUCT_IDS = 500
+
 # Pydantic models for REST API
 class WarehouseResponse(BaseModel):
     id: str
@@ -20,6 +35,7 @@ class InventoryResponse(BaseModel):
     product_id: str
     warehouse_id: str
     stock: int
+    reorder_point: Optional[int] = None
     updated_at: datetime
     warehouse: Optional[WarehouseResponse] = None
 
@@ -28,11 +44,23 @@ class UpdateStockRequest(BaseModel):
     warehouse_id: str
     quantity_change: int
 
+class SetReorderPointRequest(BaseModel):
+    product_id: str
+    warehouse_id: str
+    reorder_point: Optional[int] = None
+
 class CreateWarehouseRequest(BaseModel):
     id: str
     name: str
     location: Optional[str] = None
 
+class BulkImportResponse(BaseModel):
+    staged: int
+    upserted: int
+    skipped: int
+    deleted: int
+    notified: int
+
 
 @router.get("/warehouses", response_model=List[WarehouseResponse])
 async def get_all_warehouses():
@@ -66,6 +94,7 @@ async def get_inventory_by_product(product_id: str):
             product_id=row.product_id,
             warehouse_id=row.warehouse_id,
             stock=row.stock,
+            reorder_point=row.reorder_point,
             updated_at=row.updated_at,
             warehouse=WarehouseResponse(
                 id=row.id,
@@ -79,21 +108,80 @@ async def get_inventory_by_product(product_id: str):
     ]
 
 
-@router.get("/inventory/warehouse/{warehouse_id}", response_model=List[InventoryResponse])
-async def get_inventory_by_warehouse(warehouse_id: str):
-    """Get inventory by warehouse ID"""
+@router.get("/inventory/products", response_model=Dict[str, List[InventoryResponse]])
+async def get_inventory_by_products(ids: List[str] = Query(...)):
+    """
+    Get inventory for several products in one query, keyed by product ID.
+
+    Every requested ID is present in the response; products without stock
+    map to an empty list.
+    """
+    if len(ids) > MAX_BULK_PRODUCT_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_PRODUCT_IDS} ids per request")
     query = (
         select(InventoryModel, WarehouseModel)
         .join(WarehouseModel, InventoryModel.warehouse_id == WarehouseModel.id)
-        .where(InventoryModel.warehouse_id == warehouse_id)
+        .where(InventoryModel.product_id.in_(ids))
     )
     result = await database.fetch_all(query)
-    
+
+    inventory = {product_id: [] for product_id in ids}
+    for row in result:
+        inventory[row.product_id].append(InventoryResponse(
+            product_id=row.product_id,
+            warehouse_id=row.warehouse_id,
+            stock=row.stock,
+            reorder_point=row.reorder_point,
+            updated_at=row.updated_at,
+            warehouse=WarehouseResponse(
+                id=row.id,
+                name=row.name,
+                location=row.location,
+                created_at=row.created_at,
+                updated_at=row.updated_at
+            )
+        ))
+    return inventory
+
+
+@router.get("/inventory/warehouse/{warehouse_id}", response_model=List[InventoryResponse])
+async def get_inventory_by_warehouse(
+    warehouse_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+    stock_below: Optional[int] = None
+):
+    """
+    Get inventory by warehouse ID, optionally one page at a time.
+
+    Without `limit` or `after` every row is returned. With either, the
+    response is one page; pass the X-Next-Cursor response header back as
+    `after` to fetch the next page. The header is absent on the last page.
+    """
+    paginated = limit is not None or after is not None
+    page_size = clamp_page_size(limit) if paginated else None
+    try:
+        page = warehouse_inventory_page_query(warehouse_id, page_size, after, stock_below).subquery()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = (
+        select(page, WarehouseModel)
+        .join(WarehouseModel, page.c.warehouse_id == WarehouseModel.id)
+        .order_by(page.c.product_id)
+    )
+    result = await database.fetch_all(query)
+
+    if paginated and len(result) > page_size:
+        result = result[:page_size]
+        response.headers["X-Next-Cursor"] = encode_cursor(result[-1].product_id)
+
     return [
         InventoryResponse(
             product_id=row.product_id,
             warehouse_id=row.warehouse_id,
             stock=row.stock,
+            reorder_point=row.reorder_point,
             updated_at=row.updated_at,
             warehouse=WarehouseResponse(
                 id=row.id,
@@ -136,6 +224,10 @@ async def update_stock(request: UpdateStockRequest):
                 .values(stock=new_stock, updated_at=datetime.now())
             )
             await database.execute(update_query)
+            await notify_threshold_crossing(
+                request.product_id, request.warehouse_id,
+                existing.stock, new_stock, existing.reorder_point
+            )
         else:
             # Create new inventory record
             if request.quantity_change < 0:
@@ -164,6 +256,7 @@ async def update_stock(request: UpdateStockRequest):
             product_id=result.product_id,
             warehouse_id=result.warehouse_id,
             stock=result.stock,
+            reorder_point=result.reorder_point,
             updated_at=result.updated_at,
             warehouse=WarehouseResponse(
                 id=result.id,
@@ -175,6 +268,121 @@ async def update_stock(request: UpdateStockRequest):
         )
 
 
+@router.put("/inventory/reorder-point", response_model=InventoryResponse)
+async def set_reorder_point(request: SetReorderPointRequest):
+    """Set or clear (null) the reorder point for a product in a warehouse"""
+    if request.reorder_point is not None and request.reorder_point < 0:
+        raise HTTPException(status_code=400, detail="Reorder point cannot be negative")
+
+    async with database.transaction():
+        query = select(InventoryModel).where(
+            InventoryModel.product_id == request.product_id,
+            InventoryModel.warehouse_id == request.warehouse_id
+        )
+        existing = await database.fetch_one(query)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Inventory record not found")
+
+        update_query = (
+            InventoryModel.__table__.update()
+            .where(
+                InventoryModel.product_id == request.product_id,
+                InventoryModel.warehouse_id == request.warehouse_id
+            )
+            .values(reorder_point=request.reorder_point)
+        )
+        await database.execute(update_query)
+        await notify_reorder_point_change(
+            request.product_id, request.warehouse_id,
+            existing.stock, existing.reorder_point, request.reorder_point
+        )
+
+        result = await database.fetch_one(query)
+        return InventoryResponse(
+            product_id=result.product_id,
+            warehouse_id=result.warehouse_id,
+            stock=result.stock,
+            reorder_point=result.reorder_point,
+            updated_at=result.updated_at
+        )
+
+
+@router.get("/inventory/low-stock", response_model=List[InventoryResponse])
+async def get_low_stock(
+    response: Response,
+    warehouse_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None
+):
+    """Get one page of items below their reorder point (cursor in X-Next-Cursor)"""
+    page_size = clamp_page_size(limit)
+    try:
+        query = low_stock_page_query(page_size, warehouse_id, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = await database.fetch_all(query)
+
+    if len(result) > page_size:
+        result = result[:page_size]
+        response.headers["X-Next-Cursor"] = encode_key_cursor(result[-1].warehouse_id, result[-1].product_id)
+
+    return [
+        InventoryResponse(
+            product_id=row.product_id,
+            warehouse_id=row.warehouse_id,
+            stock=row.stock,
+            reorder_point=row.reorder_point,
+            updated_at=row.updated_at
+        )
+        for row in result
+    ]
+
+
+@router.get("/inventory/low-stock/stream")
+async def stream_low_stock(warehouse_id: Optional[str] = None):
+    """Server-Sent Events feed of reorder-point crossings"""
+    async def events():
+        async for event in broker.subscribe(warehouse_id):
+            yield f"event: {event['state'].lower()}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/inventory/import", response_model=BulkImportResponse)
+async def bulk_import_inventory(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    header: bool = True,
+    prune: bool = False
+):
+    """
+    Bulk load absolute stock levels from a streamed CSV or NDJSON body.
+
+    Rows are (product_id, warehouse_id, stock). With prune=true, inventory rows
+    for the imported warehouses that are absent from the file are deleted.
+    """
+    try:
+        result = await import_inventory(request.stream(), fmt=format, header=header, prune=prune)
+    except (ValueError, KeyError, asyncpg.DataError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import data: {e}")
+    return BulkImportResponse(**result)
+
+
+@router.get("/inventory/export")
+async def bulk_export_inventory(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    warehouse_id: Optional[str] = None
+):
+    """Stream the inventory table as CSV or NDJSON"""
+    if format == "csv":
+        return StreamingResponse(export_inventory_csv(warehouse_id), media_type="text/csv")
+    return StreamingResponse(export_inventory_ndjson(warehouse_id), media_type="application/x-ndjson")
+
+
 @router.post("/warehouses", response_model=WarehouseResponse, status_code=201)
 async def create_warehouse(request: CreateWarehouseRequest):
     """Create a new warehouse"""
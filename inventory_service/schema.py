@@ -1,10 +1,17 @@
-from typing import List, Optional
+from typing import AsyncGenerator, List, Optional
 from datetime import datetime
 import strawberry
-from sqlalchemy.orm import sessionmaker
 from sqlalchemy import select
-from database import engine, database
+from database import database
 from models import Warehouse as WarehouseModel, Inventory as InventoryModel
+from pagination import (
+    encode_cursor,
+    encode_key_cursor,
+    clamp_page_size,
+    warehouse_inventory_page_query,
+    low_stock_page_query,
+)
+from alerts import broker, notify_threshold_crossing, notify_reorder_point_change
 
 
 @strawberry.type
@@ -15,7 +22,7 @@ class Warehouse:
     created_at: datetime
     updated_at: datetime
     
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Unbounded; use inventoryConnection")
     async def inventory(self) -> List["Inventory"]:
         """Get all inventory items for this warehouse"""
         query = select(InventoryModel).where(InventoryModel.warehouse_id == self.id)
@@ -25,17 +32,29 @@ class Warehouse:
                 product_id=row.product_id,
                 warehouse_id=row.warehouse_id,
                 stock=row.stock,
+                reorder_point=row.reorder_point,
                 updated_at=row.updated_at
             )
             for row in result
         ]
 
+    @strawberry.field
+    async def inventory_connection(
+        self,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        stock_below: Optional[int] = None
+    ) -> "InventoryConnection":
+        """Get one page of inventory items for this warehouse"""
+        return await inventory_connection(self.id, first, after, stock_below)
+
 
 @strawberry.type
 class Inventory:
     product_id: str
     warehouse_id: str
     stock: int
+    reorder_point: Optional[int] = None
     updated_at: datetime
     
     @strawberry.field
@@ -54,6 +73,88 @@ class Inventory:
         return None
 
 
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str] = None
+
+
+@strawberry.type
+class InventoryEdge:
+    cursor: str
+    node: Inventory
+
+
+@strawberry.type
+class InventoryConnection:
+    edges: List[InventoryEdge]
+    page_info: PageInfo
+
+
+async def inventory_connection(warehouse_id, first=None, after=None, stock_below=None):
+    """Resolve a Relay-style page of a warehouse's inventory"""
+    limit = clamp_page_size(first)
+    query = warehouse_inventory_page_query(warehouse_id, limit, after, stock_below)
+    rows = await database.fetch_all(query)
+    has_next_page = len(rows) > limit
+    edges = [
+        InventoryEdge(
+            cursor=encode_cursor(row.product_id),
+            node=Inventory(
+                product_id=row.product_id,
+                warehouse_id=row.warehouse_id,
+                stock=row.stock,
+                reorder_point=row.reorder_point,
+                updated_at=row.updated_at
+            )
+        )
+        for row in rows[:limit]
+    ]
+    return InventoryConnection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_next_page,
+            end_cursor=edges[-1].cursor if edges else None
+        )
+    )
+
+
+async def low_stock_connection(warehouse_id=None, first=None, after=None):
+    """Resolve a page of rows below their reorder point"""
+    limit = clamp_page_size(first)
+    rows = await database.fetch_all(low_stock_page_query(limit, warehouse_id, after))
+    edges = [
+        InventoryEdge(
+            cursor=encode_key_cursor(row.warehouse_id, row.product_id),
+            node=Inventory(
+                product_id=row.product_id,
+                warehouse_id=row.warehouse_id,
+                stock=row.stock,
+                reorder_point=row.reorder_point,
+                updated_at=row.updated_at
+            )
+        )
+        for row in rows[:limit]
+    ]
+    return InventoryConnection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=len(rows) > limit,
+            end_cursor=edges[-1].cursor if edges else None
+        )
+    )
+
+
+@strawberry.type
+class LowStockEvent:
+    product_id: str
+    warehouse_id: str
+    state: str  # LOW when stock drops below the reorder point, RECOVERED when it climbs back
+    stock: int
+    previous_stock: Optional[int] = None
+    reorder_point: Optional[int] = None  # null when the threshold was cleared
+
+
 @strawberry.input
 class UpdateStockInput:
     product_id: str
@@ -61,6 +162,13 @@ class UpdateStockInput:
     quantity_change: int  # Can be positive (addition) or negative (reduction)
 
 
+@strawberry.input
+class SetReorderPointInput:
+    product_id: str
+    warehouse_id: str
+    reorder_point: Optional[int] = None  # null clears the threshold
+
+
 @strawberry.input
 class CreateWarehouseInput:
     id: str
@@ -80,12 +188,13 @@ class Query:
                 product_id=row.product_id,
                 warehouse_id=row.warehouse_id,
                 stock=row.stock,
+                reorder_point=row.reorder_point,
                 updated_at=row.updated_at
             )
             for row in result
         ]
     
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Unbounded; use warehouseInventory")
     async def get_inventory_by_warehouse(self, warehouse_id: str) -> List[Inventory]:
         """Get inventory status for a specific warehouse"""
         query = select(InventoryModel).where(InventoryModel.warehouse_id == warehouse_id)
@@ -95,11 +204,33 @@ class Query:
                 product_id=row.product_id,
                 warehouse_id=row.warehouse_id,
                 stock=row.stock,
+                reorder_point=row.reorder_point,
                 updated_at=row.updated_at
             )
             for row in result
         ]
     
+    @strawberry.field
+    async def warehouse_inventory(
+        self,
+        warehouse_id: str,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        stock_below: Optional[int] = None
+    ) -> InventoryConnection:
+        """Get a page of inventory for a warehouse, optionally only rows with stock below a level"""
+        return await inventory_connection(warehouse_id, first, after, stock_below)
+
+    @strawberry.field
+    async def low_stock(
+        self,
+        warehouse_id: Optional[str] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> InventoryConnection:
+        """Get a page of items whose stock is below their reorder point"""
+        return await low_stock_connection(warehouse_id, first, after)
+
     @strawberry.field
     async def get_all_warehouses(self) -> List[Warehouse]:
         """Get all warehouses"""
@@ -149,6 +280,10 @@ class Mutation:
                     .values(stock=new_stock, updated_at=datetime.now())
                 )
                 await database.execute(update_query)
+                await notify_threshold_crossing(
+                    input.product_id, input.warehouse_id,
+                    existing.stock, new_stock, existing.reorder_point
+                )
                 
                 # Return updated record
                 result = await database.fetch_one(query)
@@ -156,6 +291,7 @@ class Mutation:
                     product_id=result.product_id,
                     warehouse_id=result.warehouse_id,
                     stock=result.stock,
+                    reorder_point=result.reorder_point,
                     updated_at=result.updated_at
                 )
             else:
@@ -177,9 +313,49 @@ class Mutation:
                     product_id=result.product_id,
                     warehouse_id=result.warehouse_id,
                     stock=result.stock,
+                    reorder_point=result.reorder_point,
                     updated_at=result.updated_at
                 )
     
+    @strawberry.mutation
+    async def set_reorder_point(self, input: SetReorderPointInput) -> Inventory:
+        """Set or clear the reorder point for a product in a specific warehouse"""
+        async with database.transaction():
+            query = select(InventoryModel).where(
+                InventoryModel.product_id == input.product_id,
+                InventoryModel.warehouse_id == input.warehouse_id
+            )
+            existing = await database.fetch_one(query)
+            if not existing:
+                raise Exception("Inventory record not found")
+
+            if input.reorder_point is not None and input.reorder_point < 0:
+                raise Exception("Reorder point cannot be negative")
+
+            update_query = (
+                InventoryModel.__table__.update()
+                .where(
+                    InventoryModel.product_id == input.product_id,
+                    InventoryModel.warehouse_id == input.warehouse_id
+                )
+                .values(reorder_point=input.reorder_point)
+            )
+            await database.execute(update_query)
+
+            await notify_reorder_point_change(
+                input.product_id, input.warehouse_id,
+                existing.stock, existing.reorder_point, input.reorder_point
+            )
+
+            result = await database.fetch_one(query)
+            return Inventory(
+                product_id=result.product_id,
+                warehouse_id=result.warehouse_id,
+                stock=result.stock,
+                reorder_point=result.reorder_point,
+                updated_at=result.updated_at
+            )
+
     @strawberry.mutation
     async def create_warehouse(self, input: CreateWarehouseInput) -> Warehouse:
         """Create a new warehouse"""
@@ -208,4 +384,15 @@ class Mutation:
             location=result.location,
             created_at=result.created_at,
             updated_at=result.updated_at
-        )
\ No newline at end of file
+        )
+
+
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def low_stock_alerts(
+        self, warehouse_id: Optional[str] = None
+    ) -> AsyncGenerator[LowStockEvent, None]:
+        """Stream reorder-point crossings as they are committed"""
+        async for event in broker.subscribe(warehouse_id):
+            yield LowStockEvent(**event)
@@ -0,0 +1,29 @@
+"""
+Production entry point: the app under multi-worker uvicorn, without reload.
+
+    python migrate.py && python serve.py
+
+Each worker is a separate process with its own event loop and asyncpg
+pool, so the service opens up to workers x DB_POOL_MAX_SIZE connections;
+keep that below PostgreSQL's max_connections.
+
+Environment Variables:
+PORT                 - Listen port (default: 5003)
+WEB_CONCURRENCY      - Worker processes (default: one per CPU, at most UVICORN_MAX_WORKERS)
+UVICORN_MAX_WORKERS  - Cap for the derived worker count (default: 8)
+UVICORN_KEEPALIVE    - Seconds an idle keep-alive connection stays open (default: 5)
+"""
+import os
+import uvicorn
+from eai_common.workers import uvicorn_workers
+
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", 5003)),
+        workers=uvicorn_workers(),
+        timeout_keep_alive=int(os.getenv("UVICORN_KEEPALIVE", 5)),
+        proxy_headers=True,
+    )
@@ -34,10 +34,15 @@ API Endpoints:
 ------------
 GET    /orders          - Retrieve all orders
 GET    /orders/{id}     - Retrieve specific order
-POST   /orders          - Create new order
+POST   /orders          - Create new order (honours Idempotency-Key)
+POST   /orders/bulk     - Create many orders, streaming per-order results
 PUT    /orders/{id}     - Update order status
 DELETE /orders/{id}     - Delete order
-GET    /health         - Health check endpoint
+GET    /health         - Health check endpoint (cached dependency status)
+GET    /health/live    - Liveness probe
+GET    /health/ready   - Readiness probe (503 while a required dependency is down)
+GET    /metrics/idempotency - Idempotency-Key counters
+GET    /metrics/upstreams   - Circuit breaker, bulkhead and price cache state
 
 Environment Variables:
 -------------------
@@ -46,19 +51,51 @@ MYSQL_PORT      - MySQL port (default: 3306)
 MYSQL_USER      - MySQL user (default: root)
 MYSQL_PASSWORD  - MySQL password (default: empty)
 MYSQL_DATABASE  - MySQL database (default: order_db)
+IDEMPOTENCY_TTL_HOURS - How long Idempotency-Key responses are kept (default: 24)
+HEALTH_CHECK_INTERVAL - Seconds between background dependency probes (default: 10)
+HEALTH_READY_REQUIRES - Dependencies required for readiness
+                        (default: mysql,customer_service,product_service)
+UPSTREAM_TIMEOUT      - Seconds per customer/product service call (default: 5)
+UPSTREAM_RETRIES      - Retries per call on connection errors and 5xx (default: 1)
+CIRCUIT_FAILURE_THRESHOLD - Consecutive failures that open a circuit (default: 5)
+CIRCUIT_RESET_TIMEOUT - Seconds a circuit stays open before a trial call (default: 10)
+UPSTREAM_MAX_CONCURRENCY - Concurrent calls allowed per upstream (default: 10)
+BULKHEAD_MAX_WAIT     - Seconds to wait for a free upstream slot (default: 0.5)
+PRICE_CACHE_MAX_AGE   - Seconds a cached product may stand in for product_service (default: 300)
+PRICE_CACHE_MAX_ENTRIES - Products kept in the price cache, least recently used evicted (default: 10000)
 
 Usage:
 -----
 Run directly:
     python app.py
 
+Run in production (settings in gunicorn.conf.py):
+    gunicorn app:app
+
 Run with Docker:
     docker-compose up
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from database import db
-from models import Order, OrderItem
+from models import Order, OrderItem, orders_json
+from eai_common.fast_json import FastJSONProvider, dumps, json_response
+from idempotency import IdempotentRequests, JsonKeyStore, SqlKeyStore
+from health import DependencyMonitor
+from resilience import Bulkhead, CircuitBreaker, FallbackCache, Upstream
+from bulk_orders import (
+    MAX_BULK_ORDERS,
+    UpstreamError,
+    fetch_customers,
+    fetch_prices,
+    normalize_order,
+    parse_ndjson,
+    plan_orders,
+    write_orders,
+    write_orders_json,
+)
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
 import requests
 import os
 import json
@@ -75,6 +112,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # Service URLs from environment variables
 CUSTOMER_SERVICE_URL = os.getenv('CUSTOMER_SERVICE_URL', 'http://host.docker.internal:5000')
@@ -90,10 +128,21 @@ MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'order_db')
 app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Outbound call limits. Retries stay short: a dependency that keeps failing
+# trips its circuit breaker instead of holding workers through backoff.
+UPSTREAM_TIMEOUT = float(os.getenv('UPSTREAM_TIMEOUT', 5))
+UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', 1))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', 10))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv('UPSTREAM_MAX_CONCURRENCY', 10))
+BULKHEAD_MAX_WAIT = float(os.getenv('BULKHEAD_MAX_WAIT', 0.5))
+PRICE_CACHE_MAX_AGE = float(os.getenv('PRICE_CACHE_MAX_AGE', 300))
+PRICE_CACHE_MAX_ENTRIES = int(os.getenv('PRICE_CACHE_MAX_ENTRIES', 10000))
+
 # Configure retry strategy for external service calls
 retry_strategy = Retry(
-    total=3,
-    backoff_factor=1,
+    total=UPSTREAM_RETRIES,
+    backoff_factor=0.2,
     status_forcelist=[500, 502, 503, 504]
 )
 adapter = HTTPAdapter(max_retries=retry_strategy)
@@ -101,8 +150,21 @@ http = requests.Session()
 http.mount("http://", adapter)
 http.mount("https://", adapter)
 
+def guarded_upstream(name):
+    return Upstream(
+        name, http,
+        CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT),
+        Bulkhead(name, UPSTREAM_MAX_CONCURRENCY, BULKHEAD_MAX_WAIT),
+    )
+
+customer_upstream = guarded_upstream('customer_service')
+product_upstream = guarded_upstream('product_service')
+# Last good product per id, used while product_service is unavailable
+price_cache = FallbackCache(PRICE_CACHE_MAX_AGE, PRICE_CACHE_MAX_ENTRIES)
+
 # JSON storage configuration
 JSON_STORAGE_FILE = 'data/orders.json'
+IDEMPOTENCY_STORAGE_FILE = 'data/idempotency_keys.json'
 os.makedirs(os.path.dirname(JSON_STORAGE_FILE), exist_ok=True)
 
 def init_json_storage():
@@ -126,6 +188,18 @@ except Exception as e:
     init_json_storage()
     USE_JSON_STORAGE = True
 
+# Replays of POST /orders with the same Idempotency-Key return the stored response
+idempotency = IdempotentRequests(
+    JsonKeyStore(IDEMPOTENCY_STORAGE_FILE) if USE_JSON_STORAGE else SqlKeyStore(db)
+)
+try:
+    with app.app_context():
+        pruned = idempotency.prune()
+    if pruned:
+        logger.info(f"Pruned {pruned} expired idempotency keys")
+except Exception as e:
+    logger.error(f"Failed to prune idempotency keys: {e}")
+
 def load_json_data():
     try:
         with open(JSON_STORAGE_FILE, 'r') as f:
@@ -141,54 +215,104 @@ def save_json_data(data):
 
 def validate_order_data(data):
     """Validate order input data"""
+    if not isinstance(data, dict):
+        return False, 'order must be an object'
     if not data.get('customer_id'):
         return False, 'customer_id is required'
-    if not data.get('items'):
+    items = data.get('items')
+    if not items:
         return False, 'items are required'
-    for item in data.get('items', []):
+    if not isinstance(items, list):
+        return False, 'items must be a list of objects'
+    for item in items:
+        if not isinstance(item, dict):
+            return False, 'each item must be an object'
         if not item.get('product_id'):
             return False, 'product_id is required for each item'
-        if not item.get('quantity') or item['quantity'] < 1:
-            return False, 'valid quantity is required for each item'
+        quantity = item.get('quantity')
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            return False, 'quantity must be a positive integer for each item'
     return True, None
 
+# Health probes use their own session: a probe should report a failure, not retry it
+probe_http = requests.Session()
+
+def http_probe(url):
+    def probe(timeout):
+        probe_http.get(url, timeout=timeout).raise_for_status()
+    return probe
+
+# The MySQL probe opens its own unpooled connection, bounded by the probe
+# timeout, so a hung server cannot stall the monitor for the driver's default
+probe_engines = {}
+
+def database_probe(timeout):
+    engine = probe_engines.get(timeout)
+    if engine is None:
+        engine = probe_engines[timeout] = create_engine(
+            app.config['SQLALCHEMY_DATABASE_URI'],
+            poolclass=NullPool,
+            connect_args={'connect_timeout': timeout, 'read_timeout': timeout, 'write_timeout': timeout},
+        )
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+
+dependency_probes = {
+    'customer_service': http_probe(f'{CUSTOMER_SERVICE_URL}/health'),
+    'product_service': http_probe(f'{PRODUCT_SERVICE_URL}/health'),
+}
+if not USE_JSON_STORAGE:
+    dependency_probes['mysql'] = database_probe
+dependencies = DependencyMonitor(dependency_probes)
+
+# Dependencies that must be UP for /health/ready to return 200
+HEALTH_READY_REQUIRES = [
+    name.strip()
+    for name in os.getenv('HEALTH_READY_REQUIRES', 'mysql,customer_service,product_service').split(',')
+    if name.strip() in dependency_probes
+]
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; dependency status comes from the background monitor"""
+    status = dependencies.snapshot()
     health = {
         'status': 'UP',
-        'mysql': 'UP' if not USE_JSON_STORAGE else 'DOWN',
+        'mysql': status['mysql']['status'] if 'mysql' in status else 'DOWN',
         'timestamp': datetime.utcnow().isoformat(),
         'dependencies': {
-            'customer_service': 'UNKNOWN',
-            'product_service': 'UNKNOWN'
-        }
+            'customer_service': status['customer_service']['status'],
+            'product_service': status['product_service']['status']
+        },
+        'details': status
     }
-    
-    # Check customer service
-    try:
-        customer_response = http.get(f'{CUSTOMER_SERVICE_URL}/health', timeout=2)
-        health['dependencies']['customer_service'] = 'UP' if customer_response.ok else 'DOWN'
-    except:
-        health['dependencies']['customer_service'] = 'DOWN'
-    
-    # Check product service
-    try:
-        product_response = http.get(f'{PRODUCT_SERVICE_URL}/health', timeout=2)
-        health['dependencies']['product_service'] = 'UP' if product_response.ok else 'DOWN'
-    except:
-        health['dependencies']['product_service'] = 'DOWN'
-    
     return jsonify(health)
 
+@app.route('/health/live', methods=['GET'])
+def liveness():
+    """Liveness: the process is serving requests; never touches dependencies"""
+    return jsonify({'status': 'UP'})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness():
+    """Readiness: 200 when every required dependency was UP at the last probe, else 503"""
+    status = dependencies.snapshot()
+    ready = all(status[name]['status'] == 'UP' for name in HEALTH_READY_REQUIRES)
+    body = {
+        'status': 'READY' if ready else 'NOT_READY',
+        'storage': 'json' if USE_JSON_STORAGE else 'mysql',
+        'required': HEALTH_READY_REQUIRES,
+        'dependencies': status,
+    }
+    return jsonify(body), 200 if ready else 503
+
 @app.route('/orders', methods=['GET'])
 def get_orders():
     """Get all orders"""
     logger.info("Fetching all orders")
     if not USE_JSON_STORAGE:
         try:
-            orders = Order.query.all()
-            return jsonify([order.to_dict() for order in orders])
+            return json_response(orders_json(db.session))
         except Exception as e:
             logger.error(f"Error fetching orders from database: {e}")
             return jsonify({'error': 'Failed to fetch orders'}), 500
@@ -224,7 +348,132 @@ def get_order(order_id):
 
 @app.route('/orders', methods=['POST'])
 def create_order():
-    """Create new order"""
+    """
+    Create new order.
+
+    With an Idempotency-Key header, retries of the same request return the
+    original response instead of creating another order.
+    """
+    key = request.headers.get('Idempotency-Key')
+    if key is None:
+        return place_order()
+    return idempotency.handle(key, request.get_data(), place_order)
+
+@app.route('/orders/bulk', methods=['POST'])
+def create_orders_bulk():
+    """
+    Create many orders in one request.
+
+    Accepts a JSON array of orders, or NDJSON (one order per line) with
+    Content-Type application/x-ndjson. Customers and products are looked up
+    once per distinct id, then orders are written in chunked transactions.
+    Every chunk is written before the response starts, so a client that
+    disconnects mid-response still has all of its orders stored and can
+    list them. The response is NDJSON: one line per input order ({"index",
+    "status": "created" | "error", ...}) in completion order, then a
+    {"summary": ...} line.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        orders = list(parse_ndjson(request.stream))
+    else:
+        orders = request.get_json(silent=True)
+        if not isinstance(orders, list):
+            return jsonify({'error': 'Expected a JSON array of orders or an NDJSON body'}), 400
+    if len(orders) > MAX_BULK_ORDERS:
+        return jsonify({'error': f'At most {MAX_BULK_ORDERS} orders per request'}), 400
+
+    rejected = []
+    valid = []
+    for index, data in enumerate(orders):
+        if isinstance(data, Exception) or not isinstance(data, dict):
+            error = str(data) if isinstance(data, Exception) else 'each order must be an object'
+            rejected.append({'index': index, 'status': 'error', 'error': error})
+            continue
+        try:
+            is_valid, error = validate_order_data(data)
+            if is_valid:
+                valid.append((index, *normalize_order(data)))
+        except (TypeError, ValueError) as e:
+            is_valid, error = False, str(e)
+        if not is_valid:
+            rejected.append({'index': index, 'status': 'error', 'error': error})
+
+    try:
+        customers = fetch_customers(
+            customer_upstream, CUSTOMER_SERVICE_URL, {customer_id for _, customer_id, _ in valid}
+        )
+        prices = fetch_prices(
+            product_upstream, PRODUCT_SERVICE_URL,
+            {product_id for _, _, items in valid for product_id, _ in items},
+            price_cache=price_cache,
+        )
+    except UpstreamError as e:
+        logger.error(f"Bulk order lookup failed: {e}")
+        return jsonify({'error': str(e)}), 503
+    ready, unpriced = plan_orders(valid, customers, prices)
+    rejected.extend(unpriced)
+    logger.info(f"Bulk order request: {len(orders)} orders, {len(ready)} ready to write")
+
+    # Write everything before responding: the response only reports committed work
+    if USE_JSON_STORAGE:
+        json_data = load_json_data()
+        written = write_orders_json(json_data, ready)
+        save_json_data(json_data)
+    else:
+        written = [result for results in write_orders(db.engine, ready) for result in results]
+    results = rejected + written
+    summary = {'created': 0, 'error': 0}
+    for result in results:
+        summary[result['status']] += 1
+    logger.info(f"Bulk order request finished: {summary}")
+
+    def generate():
+        for result in results:
+            yield dumps(result) + b'\n'
+        yield dumps({'summary': summary}) + b'\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/metrics/idempotency', methods=['GET'])
+def idempotency_metrics():
+    """Idempotency-Key counters for this process"""
+    return jsonify(idempotency.stats())
+
+@app.route('/metrics/upstreams', methods=['GET'])
+def upstream_metrics():
+    """Circuit breaker, bulkhead and price cache state for this process"""
+    return jsonify({
+        'customer_service': customer_upstream.stats(),
+        'product_service': product_upstream.stats(),
+        'price_cache': price_cache.stats(),
+    })
+
+def fetch_product(product_id):
+    """
+    Return the product from product_service, or None if it does not exist.
+
+    While product_service is unavailable (including an open circuit) the
+    last good copy from the price cache is used; without one the
+    RequestException is raised.
+    """
+    try:
+        response = product_upstream.get(f'{PRODUCT_SERVICE_URL}/products/{product_id}', timeout=UPSTREAM_TIMEOUT)
+        if response.status_code >= 500:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        product = price_cache.get(product_id)
+        if product is None:
+            raise
+        logger.warning(f"Product Service unavailable ({e}); using cached price for product {product_id}")
+        return product
+    if response.status_code != 200:
+        return None
+    product = response.json()
+    price_cache.put(product_id, product)
+    return product
+
+def place_order():
+    """Validate, price and store the order in the request"""
     logger.info("Creating new order")
     data = request.get_json()
     
@@ -238,7 +487,7 @@ def create_order():
     
     # Verify customer exists
     try:
-        customer_response = http.post(f'{CUSTOMER_SERVICE_URL}/graphql', json={
+        customer_response = customer_upstream.post(f'{CUSTOMER_SERVICE_URL}/graphql', json={
             'query': '''
                 query GetCustomer($id: Int!) {
                     getCustomer(id: $id) {
@@ -249,7 +498,7 @@ def create_order():
                 }
             ''',
             'variables': {'id': int(customer_id)}
-        }, timeout=5)
+        }, timeout=UPSTREAM_TIMEOUT)
         
         if customer_response.status_code != 200:
             logger.error(f"Customer service returned status {customer_response.status_code}")
@@ -279,9 +528,8 @@ def create_order():
             for item_data in data.get('items', []):
                 try:
                     # Verify product exists and get price
-                    product_response = http.get(f'{PRODUCT_SERVICE_URL}/products/{item_data["product_id"]}', timeout=5)
-                    if product_response.status_code == 200:
-                        product = product_response.json()
+                    product = fetch_product(item_data['product_id'])
+                    if product is not None:
                         unit_price = float(product.get('price', 0))
                         
                         order_item = OrderItem(
@@ -336,9 +584,8 @@ def create_order():
             for item_data in data.get('items', []):
                 try:
                     # Verify product exists and get price
-                    product_response = http.get(f'{PRODUCT_SERVICE_URL}/products/{item_data["product_id"]}', timeout=5)
-                    if product_response.status_code == 200:
-                        product = product_response.json()
+                    product = fetch_product(item_data['product_id'])
+                    if product is not None:
                         unit_price = float(product.get('price', 0))
                         
                         order_item = {
@@ -0,0 +1,80 @@
+"""
+Write throughput of bulk order creation.
+
+    python bench_bulk_orders.py --orders 20000
+    python bench_bulk_orders.py --database-url mysql+pymysql://root:@localhost:3306/order_db
+
+Runs the planning and chunked write passes of POST /orders/bulk
+(plan_orders + write_orders) against a scratch SQLite database, or the given
+database URL, and compares them with one transaction per order as
+POST /orders does. Customer and product lookups are replaced by in-memory
+tables, so only the database work is measured.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, insert, text
+from database import db
+from models import Order, OrderItem
+from bulk_orders import BULK_ORDER_CHUNK_SIZE, plan_orders, write_orders
+
+
+def synthetic_orders(count, products):
+    for index in range(count):
+        items = [(random.randint(1, products), random.randint(1, 5)) for _ in range(random.randint(1, 5))]
+        yield index, random.randint(1, 1000), items
+
+
+def write_one_by_one(engine, ready):
+    for _, customer_id, rows, total_amount in ready:
+        with engine.begin() as connection:
+            order_id = connection.execute(insert(Order).values(
+                customer_id=customer_id, status='PENDING', total_amount=total_amount
+            )).inserted_primary_key[0]
+            connection.execute(insert(OrderItem), [dict(row, order_id=order_id) for row in rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk order write benchmark")
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=BULK_ORDER_CHUNK_SIZE)
+    parser.add_argument("--single-orders", type=int, default=2000,
+                        help="orders to write one transaction at a time for comparison")
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="orders_bench_"), "orders.db")
+    engine = create_engine(url)
+    db.metadata.create_all(engine)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            connection.execute(text("PRAGMA journal_mode=WAL"))
+
+    customers = set(range(1, 1001))
+    prices = {product_id: round(random.uniform(1, 100), 2) for product_id in range(1, args.products + 1)}
+
+    orders = list(synthetic_orders(args.orders, args.products))
+    start = time.perf_counter()
+    ready, rejected = plan_orders(orders, customers, prices)
+    created = sum(
+        result["status"] == "created"
+        for results in write_orders(engine, ready, args.chunk_size)
+        for result in results
+    )
+    elapsed = time.perf_counter() - start
+    print(f"{engine.dialect.name}: bulk      {created} orders in {elapsed:6.2f} s "
+          f"= {created / elapsed:8.0f} orders/s (chunks of {args.chunk_size})")
+
+    single = ready[:args.single_orders]
+    start = time.perf_counter()
+    write_one_by_one(engine, single)
+    elapsed = time.perf_counter() - start
+    print(f"{engine.dialect.name}: per-order {len(single)} orders in {elapsed:6.2f} s "
+          f"= {len(single) / elapsed:8.0f} orders/s (one transaction each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Serialization cost of the order list, per 10k orders.
+
+    python bench_serialization.py --orders 10000 --repeat 5
+    JSON_ENCODER=stdlib python bench_serialization.py   # without orjson
+
+Runs against a scratch SQLite database so it needs no MySQL. Compares the
+previous GET /orders path (Order.query.all() with lazily loaded items ->
+to_dict() -> Flask's default encoder, which sorts keys) with to_dict()
+through the fast encoder and with orders_json(), which GET /orders now uses.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from database import db
+from eai_common.fast_json import JSON_ENCODER, dumps
+from models import Order, OrderItem, orders_json
+
+STATUSES = ["PENDING", "PROCESSING", "COMPLETED", "CANCELLED"]
+
+
+def flask_default_dumps(obj):
+    # What jsonify did with DefaultJSONProvider outside debug mode
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+
+
+def seed(engine, count):
+    db.metadata.create_all(engine)
+    start = datetime(2024, 3, 1)
+    orders = []
+    items = []
+    for order_id in range(1, count + 1):
+        created_at = start + timedelta(minutes=order_id)
+        lines = [
+            {
+                "order_id": order_id,
+                "product_id": random.randint(1, 5000),
+                "quantity": random.randint(1, 5),
+                "unit_price": round(random.uniform(1, 100), 2),
+            }
+            for _ in range(random.randint(1, 5))
+        ]
+        items.extend(lines)
+        orders.append({
+            "id": order_id,
+            "customer_id": random.randint(1, 1000),
+            "created_at": created_at,
+            "updated_at": created_at,
+            "status": random.choice(STATUSES),
+            "total_amount": sum(line["quantity"] * line["unit_price"] for line in lines),
+        })
+    with engine.begin() as conn:
+        conn.execute(insert(Order), orders)
+        conn.execute(insert(OrderItem), items)
+    return len(items)
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order list serialization benchmark")
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="orders_bench_"), "orders.db")
+    engine = create_engine(f"sqlite:///{path}")
+    item_count = seed(engine, args.orders)
+
+    def to_dicts():
+        with Session(engine) as session:
+            return [order.to_dict() for order in session.scalars(select(Order))]
+
+    def rows_path():
+        with Session(engine) as session:
+            return orders_json(session)
+
+    payload = to_dicts()
+    cases = [
+        ("to_dict + flask default (before)",
+         lambda: flask_default_dumps(to_dicts()),
+         lambda: flask_default_dumps(payload)),
+        (f"to_dict + {JSON_ENCODER}",
+         lambda: dumps(to_dicts()),
+         lambda: dumps(payload)),
+        (f"orders_json + {JSON_ENCODER}", rows_path, None),
+    ]
+
+    scale = 10000 / args.orders
+    print(f"{args.orders} orders with {item_count} items, best of {args.repeat}; times per 10k orders")
+    print(f"{'path':<36} {'query+encode':>13} {'encode':>10} {'bytes':>10}")
+    for name, end_to_end, encode_only in cases:
+        total, body = best_of(args.repeat, end_to_end)
+        encode = f"{best_of(args.repeat, encode_only)[0] * scale * 1000:7.1f} ms" if encode_only else f"{'-':>10}"
+        print(f"{name:<36} {total * scale * 1000:10.1f} ms {encode} {len(body):10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Bulk order creation for POST /orders/bulk.
+
+Instead of one customer lookup, one product lookup per item and one commit
+per order, a bulk upload is processed in three passes:
+
+1. Every order is validated locally; the distinct customer ids and product
+   ids across all valid orders are collected.
+2. Customers are checked with customer_service's ``getCustomers`` and
+   products are priced with product_service's ``POST /products/prices``,
+   both in batches of 1000 distinct ids.
+3. Orders that passed are written in chunks of BULK_ORDER_CHUNK_SIZE, one
+   transaction per chunk. Items are inserted with a single executemany per
+   chunk; orders too where the driver can return the generated ids
+   (SQLite, MariaDB), otherwise one INSERT per order inside the chunk's
+   transaction (MySQL).
+
+Results are produced per chunk; the endpoint writes every chunk before it
+starts responding, so a dropped connection never leaves orders unwritten.
+"""
+import json
+import logging
+import os
+from datetime import datetime
+import requests
+from sqlalchemy import insert
+from models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+# Batch limits of customer_service getCustomers and product_service POST /products/prices
+CUSTOMER_BATCH_SIZE = 1000
+PRODUCT_BATCH_SIZE = 1000
+BULK_ORDER_CHUNK_SIZE = int(os.getenv('BULK_ORDER_CHUNK_SIZE', 500))
+MAX_BULK_ORDERS = int(os.getenv('MAX_BULK_ORDERS', 10000))
+
+GET_CUSTOMERS_QUERY = '''
+    query GetCustomers($ids: [Int!]!) {
+        getCustomers(ids: $ids) {
+            id
+        }
+    }
+'''
+
+
+class UpstreamError(Exception):
+    """A dependency could not answer a batch lookup; nothing has been written"""
+
+
+def parse_ndjson(lines):
+    """Yield one item per non-empty NDJSON line; bad JSON becomes an error marker"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON: {e}")
+
+
+def _batches(values, size):
+    values = sorted(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def fetch_customers(http, base_url, customer_ids, timeout=10):
+    """Return the subset of customer_ids that exist"""
+    found = set()
+    for batch in _batches(customer_ids, CUSTOMER_BATCH_SIZE):
+        try:
+            response = http.post(
+                f'{base_url}/graphql',
+                json={'query': GET_CUSTOMERS_QUERY, 'variables': {'ids': batch}},
+                timeout=timeout,
+            )
+        except requests.RequestException as e:
+            raise UpstreamError(f'Error communicating with Customer Service: {e}')
+        if response.status_code != 200:
+            raise UpstreamError(f'Customer Service returned status {response.status_code}')
+        result = response.json()
+        if result.get('errors'):
+            raise UpstreamError(f"Customer Service error: {result['errors'][0].get('message')}")
+        found.update(customer['id'] for customer in result['data']['getCustomers'] if customer)
+    return found
+
+
+def _cached_prices(price_cache, product_ids):
+    """{product_id: price} from the cache, or None unless every product is cached"""
+    if price_cache is None:
+        return None
+    prices = {}
+    for product_id in product_ids:
+        product = price_cache.get(product_id)
+        if product is None:
+            return None
+        prices[product_id] = float(product.get('price', 0))
+    return prices
+
+
+def fetch_prices(http, base_url, product_ids, timeout=10, price_cache=None):
+    """
+    Return {product_id: current unit price} for the products that exist.
+
+    Prices are stored in ``price_cache`` if given. If product_service is
+    unreachable or answers 5xx (as fetch_product in app.py handles it) and
+    the cache holds every product of a batch, the cached prices are used for
+    that batch.
+    """
+    prices = {}
+    for batch in _batches(product_ids, PRODUCT_BATCH_SIZE):
+        try:
+            response = http.post(
+                f'{base_url}/products/prices',
+                json={'items': [{'product_id': product_id, 'quantity': 1} for product_id in batch]},
+                timeout=timeout,
+            )
+            if response.status_code >= 500:
+                response.raise_for_status()
+        except requests.RequestException as e:
+            cached = _cached_prices(price_cache, batch)
+            if cached is None:
+                raise UpstreamError(f'Error communicating with Product Service: {e}')
+            logger.warning(f"Product Service unavailable ({e}); using cached prices for {len(batch)} products")
+            prices.update(cached)
+            continue
+        if response.status_code != 200:
+            raise UpstreamError(f'Product Service returned status {response.status_code}')
+        for line in response.json()['items']:
+            if 'unit_price' in line:
+                prices[line['product_id']] = float(line['unit_price'])
+                if price_cache is not None:
+                    price_cache.put(line['product_id'], {'id': line['product_id'], 'price': line['unit_price']})
+    return prices
+
+
+def normalize_order(data):
+    """Return (customer_id, [(product_id, quantity)]) with integer ids, or raise ValueError"""
+    try:
+        customer_id = int(data['customer_id'])
+        items = [(int(item['product_id']), int(item['quantity'])) for item in data['items']]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('customer_id, product_id and quantity must be integers')
+    return customer_id, items
+
+
+def plan_orders(orders, customers, prices):
+    """
+    Price normalized orders against the looked-up customers and products.
+
+    ``orders`` are (index, customer_id, items) tuples. Returns (ready,
+    results): ready orders carry their rows; results hold one error entry
+    per rejected order.
+    """
+    ready = []
+    results = []
+    for index, customer_id, items in orders:
+        if customer_id not in customers:
+            results.append({'index': index, 'status': 'error', 'error': f'Customer {customer_id} not found'})
+            continue
+        missing = next((product_id for product_id, _ in items if product_id not in prices), None)
+        if missing is not None:
+            results.append({'index': index, 'status': 'error', 'error': f'Product {missing} not found'})
+            continue
+        rows = [
+            {'product_id': product_id, 'quantity': quantity, 'unit_price': prices[product_id]}
+            for product_id, quantity in items
+        ]
+        total_amount = sum(row['unit_price'] * row['quantity'] for row in rows)
+        ready.append((index, customer_id, rows, total_amount))
+    return ready, results
+
+
+def _insert_order_ids(connection, order_rows):
+    if connection.dialect.insert_executemany_returning_sort_by_parameter_order:
+        statement = insert(Order).returning(Order.id, sort_by_parameter_order=True)
+        return connection.execute(statement, order_rows).scalars().all()
+    # No multi-row RETURNING (MySQL): one INSERT per order, still in the chunk's transaction
+    return [connection.execute(insert(Order), row).inserted_primary_key[0] for row in order_rows]
+
+
+def write_orders(engine, ready, chunk_size=BULK_ORDER_CHUNK_SIZE):
+    """Insert ready orders in chunked transactions; yield the results of each chunk"""
+    for start in range(0, len(ready), chunk_size):
+        chunk = ready[start:start + chunk_size]
+        now = datetime.utcnow()
+        order_rows = [
+            {'customer_id': customer_id, 'created_at': now, 'updated_at': now,
+             'status': 'PENDING', 'total_amount': total_amount}
+            for _, customer_id, _, total_amount in chunk
+        ]
+        try:
+            with engine.begin() as connection:
+                order_ids = _insert_order_ids(connection, order_rows)
+                item_rows = [
+                    dict(row, order_id=order_id)
+                    for order_id, (_, _, rows, _) in zip(order_ids, chunk)
+                    for row in rows
+                ]
+                connection.execute(insert(OrderItem), item_rows)
+        except Exception as e:
+            yield [{'index': index, 'status': 'error', 'error': f'Database error: {e}'} for index, *_ in chunk]
+            continue
+        yield [
+            {'index': index, 'status': 'created', 'id': order_id, 'total_amount': total_amount}
+            for order_id, (index, _, _, total_amount) in zip(order_ids, chunk)
+        ]
+
+
+def write_orders_json(json_data, ready):
+    """Append ready orders to the JSON storage document; return their results"""
+    now = datetime.utcnow().isoformat()
+    order_id = json_data['next_order_id']
+    item_id = json_data['next_item_id']
+    results = []
+    for index, customer_id, rows, total_amount in ready:
+        items = []
+        for row in rows:
+            items.append(dict(row, id=item_id))
+            item_id += 1
+        json_data['orders'].append({
+            'id': order_id,
+            'customer_id': customer_id,
+            'created_at': now,
+            'updated_at': now,
+            'status': 'PENDING',
+            'total_amount': total_amount,
+            'items': items,
+        })
+        results.append({'index': index, 'status': 'created', 'id': order_id, 'total_amount': total_amount})
+        order_id += 1
+    json_data['next_order_id'] = order_id
+    json_data['next_item_id'] = item_id
+    return results
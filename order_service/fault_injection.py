@@ -0,0 +1,242 @@
+"""
+Fault-injection check for upstream failures and dropped bulk-upload clients.
+
+    python fault_injection.py
+
+Starts a stub customer_service/product_service on a local port whose
+behaviour can be switched between ok, 500 and slow, runs the order service
+in JSON storage mode (in a scratch directory) against it and checks that:
+
+- an order caches its product prices while product_service is healthy;
+- a bulk upload prices cached products from the cache while
+  product_service returns 500;
+- while product_service returns 500 the circuit opens after
+  CIRCUIT_FAILURE_THRESHOLD failures, later calls fail fast, and orders for
+  cached products are still priced from the cache;
+- orders for uncached products get 503 without waiting on the upstream;
+- after CIRCUIT_RESET_TIMEOUT a trial call closes the circuit again;
+- a bulk upload whose client disconnects after the first response line
+  still stores every order it accepted;
+- malformed bulk rows (items not a list of objects, non-integer
+  quantities) are rejected one by one with a validation message;
+- with a slow product_service, calls beyond UPSTREAM_MAX_CONCURRENCY are
+  rejected by the bulkhead instead of queueing;
+- a half-open trial call that raises something other than a
+  RequestException re-opens the circuit instead of leaving it stuck;
+- the price cache evicts its least recently used entries past its bound.
+
+Exits non-zero if any check fails.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 1.0
+MAX_CONCURRENCY = 2
+SLOW_SECONDS = 1.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # 'ok', '500' or 'slow'; switched by the checks below
+    mode = 'ok'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _fault(self):
+        if StubHandler.mode == '500':
+            self._reply(500, {'error': 'injected failure'})
+            return True
+        if StubHandler.mode == 'slow':
+            time.sleep(SLOW_SECONDS)
+        return False
+
+    def do_GET(self):
+        if self.path == '/health':
+            return self._reply(200, {'status': 'UP'})
+        if self._fault():
+            return
+        product_id = int(self.path.rsplit('/', 1)[-1])
+        self._reply(200, {'id': product_id, 'price': 10.0 + product_id})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        if self.path == '/products/prices':
+            if self._fault():
+                return
+            items = [dict(item, unit_price=10.0 + item['product_id']) for item in body['items']]
+            return self._reply(200, {'items': items})
+        if 'getCustomers' in body['query']:
+            return self._reply(200, {'data': {'getCustomers': [{'id': id} for id in body['variables']['ids']]}})
+        self._reply(200, {'data': {'getCustomer': {'id': 1, 'name': 'Stub', 'email': 'stub@example.com'}}})
+
+
+class Checks:
+    def __init__(self):
+        self.failed = 0
+
+    def check(self, condition, description):
+        print(f"{'ok  ' if condition else 'FAIL'} {description}")
+        if not condition:
+            self.failed += 1
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub_url = f'http://127.0.0.1:{server.server_port}'
+
+    os.environ.update({
+        'MYSQL_HOST': '127.0.0.1',
+        'MYSQL_PORT': '1',  # nothing listens there: JSON storage mode
+        'CUSTOMER_SERVICE_URL': stub_url,
+        'PRODUCT_SERVICE_URL': stub_url,
+        'UPSTREAM_TIMEOUT': str(SLOW_SECONDS * 3),
+        'UPSTREAM_RETRIES': '0',
+        'CIRCUIT_FAILURE_THRESHOLD': str(FAILURE_THRESHOLD),
+        'CIRCUIT_RESET_TIMEOUT': str(RESET_TIMEOUT),
+        'UPSTREAM_MAX_CONCURRENCY': str(MAX_CONCURRENCY),
+        'BULKHEAD_MAX_WAIT': '0.1',
+    })
+    # JSON storage files are created relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix='order_faults_'))
+    import app as order_app
+    from resilience import Bulkhead, BulkheadFullError, CircuitBreaker, FallbackCache, Upstream
+
+    client = order_app.app.test_client()
+    breaker = order_app.product_upstream.breaker
+    checks = Checks()
+
+    def order(product_id):
+        start = time.perf_counter()
+        response = client.post('/orders', json={'customer_id': 1, 'items': [{'product_id': product_id, 'quantity': 2}]})
+        return response, time.perf_counter() - start
+
+    response, _ = order(1)
+    checks.check(response.status_code == 201 and response.get_json()['total_amount'] == 22.0,
+                 'order is created and priced while product_service is healthy')
+
+    StubHandler.mode = '500'
+    response = client.post('/orders/bulk', json=[{'customer_id': 1, 'items': [{'product_id': 1, 'quantity': 1}]}])
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    checks.check(response.status_code == 200 and lines[0].get('total_amount') == 11.0,
+                 'bulk orders for a cached product use the cached price while product_service fails')
+
+    for _ in range(FAILURE_THRESHOLD):
+        response, _ = order(1)
+    checks.check(response.status_code == 201 and response.get_json()['total_amount'] == 22.0,
+                 'orders for a cached product use the cached price while product_service fails')
+    checks.check(breaker.state == 'OPEN', f'circuit opens after {FAILURE_THRESHOLD} failures')
+
+    rejected = breaker.rejected
+    response, elapsed = order(2)
+    checks.check(response.status_code == 503 and breaker.rejected == rejected + 1 and elapsed < 0.1,
+                 f'uncached product fails fast with 503 while the circuit is open ({elapsed * 1000:.1f} ms)')
+
+    StubHandler.mode = 'ok'
+    time.sleep(RESET_TIMEOUT + 0.1)
+    response, _ = order(2)
+    checks.check(response.status_code == 201 and breaker.state == 'CLOSED',
+                 'a trial call after the reset timeout closes the circuit')
+
+    before = len(client.get('/orders').get_json())
+    uploads = [{'customer_id': 1, 'items': []}] + [
+        {'customer_id': 1, 'items': [{'product_id': 1 + index % 3, 'quantity': 1}]} for index in range(50)
+    ]
+    response = client.post('/orders/bulk', json=uploads, buffered=False)
+    first_line = json.loads(next(iter(response.response)))
+    response.close()  # the client goes away after one line
+    stored = len(client.get('/orders').get_json()) - before
+    checks.check(first_line['status'] == 'error' and stored == 50,
+                 f'a bulk upload read only partially still stored all {stored} accepted orders')
+
+    malformed = [
+        {'customer_id': 1, 'items': 'abc'},
+        {'customer_id': 1, 'items': [5]},
+        {'customer_id': 1, 'items': [{'product_id': 1, 'quantity': 'two'}]},
+        {'customer_id': 1, 'items': [{'product_id': 1, 'quantity': 1}]},
+    ]
+    response = client.post('/orders/bulk', json=malformed)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    errors = {line['index']: line['error'] for line in lines if line.get('status') == 'error'}
+    checks.check(response.status_code == 200 and sorted(errors) == [0, 1, 2] and lines[-1]['summary']['created'] == 1
+                 and not any('not supported' in error for error in errors.values()),
+                 f'malformed bulk rows are rejected individually: {sorted(set(errors.values()))}')
+
+    StubHandler.mode = 'slow'
+    outcomes = []
+
+    def call():
+        start = time.perf_counter()
+        try:
+            order_app.product_upstream.get(f'{stub_url}/products/3', timeout=SLOW_SECONDS * 3)
+            outcomes.append(('ok', time.perf_counter() - start))
+        except BulkheadFullError:
+            outcomes.append(('rejected', time.perf_counter() - start))
+
+    threads = [threading.Thread(target=call) for _ in range(MAX_CONCURRENCY * 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    completed = [elapsed for outcome, elapsed in outcomes if outcome == 'ok']
+    rejected = [elapsed for outcome, elapsed in outcomes if outcome == 'rejected']
+    checks.check(len(completed) == MAX_CONCURRENCY and rejected and max(rejected) < SLOW_SECONDS / 2,
+                 f'bulkhead admits {len(completed)} slow calls and rejects {len(rejected)} '
+                 f'within {max(rejected, default=0) * 1000:.0f} ms')
+    checks.check(breaker.state == 'CLOSED', 'bulkhead rejections do not open the circuit')
+
+    class BrokenSession:
+        def request(self, method, url, **kwargs):
+            raise RuntimeError('not a RequestException')
+
+    broken = Upstream('broken', BrokenSession(), CircuitBreaker('broken', 1, RESET_TIMEOUT), Bulkhead('broken'))
+    broken.breaker.record_failure()  # open the circuit
+    time.sleep(RESET_TIMEOUT + 0.1)
+    try:
+        broken.get(stub_url)  # the half-open trial
+    except RuntimeError:
+        pass
+    time.sleep(RESET_TIMEOUT + 0.1)
+    broken.session = order_app.product_upstream.session
+    StubHandler.mode = 'ok'
+    try:
+        recovered = broken.get(f'{stub_url}/health', timeout=5).ok
+    except requests.RequestException:
+        recovered = False
+    checks.check(recovered and broken.breaker.state == 'CLOSED',
+                 'a half-open trial raising a non-RequestException does not leave the circuit stuck')
+
+    cache = FallbackCache(max_age=60, max_entries=2)
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    cache.get(1)
+    cache.put(3, 'c')
+    checks.check(cache.get(2) is None and cache.get(1) == 'a' and len(cache.entries) == 2,
+                 'price cache evicts the least recently used entry past max_entries')
+
+    metrics = client.get('/metrics/upstreams').get_json()
+    print(json.dumps(metrics, indent=2))
+    server.shutdown()
+    if checks.failed:
+        print(f'{checks.failed} check(s) failed')
+        sys.exit(1)
+    print('all checks passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Gunicorn settings for order_service; read from the working directory by
+
+    gunicorn app:app
+
+Workers are threaded (gthread) by default: requests spend most of their
+time waiting on customer_service, product_service and MySQL, so each
+worker process serves GUNICORN_THREADS requests at once. Set
+GUNICORN_WORKER_CLASS=gevent (and install gevent) for many more concurrent
+slow upstream calls per worker.
+
+JSON storage mode is single-process: the orders and idempotency-key files
+have no lock shared between processes. The app falls back to it when it
+cannot reach MySQL, so when MySQL at MYSQL_HOST:MYSQL_PORT does not accept
+connections at startup, exactly one worker is started whatever
+WEB_CONCURRENCY says.
+
+Environment Variables:
+PORT                  - Listen port (default: 5004)
+MYSQL_HOST, MYSQL_PORT - MySQL checked at startup (default: localhost:3306)
+WEB_CONCURRENCY       - Worker processes (default: 2 x CPUs + 1, at most GUNICORN_MAX_WORKERS)
+GUNICORN_MAX_WORKERS  - Cap for the derived worker count (default: 8)
+GUNICORN_WORKER_CLASS - gthread, gevent or sync (default: gthread)
+GUNICORN_THREADS      - Threads per gthread worker (default: 4)
+GUNICORN_WORKER_CONNECTIONS - Concurrent requests per gevent worker (default: 1000)
+GUNICORN_TIMEOUT      - Seconds before a silent worker is restarted (default: 30)
+"""
+import os
+import socket
+from eai_common.workers import gunicorn_workers
+
+
+def mysql_reachable(timeout=3):
+    """Whether MySQL accepts connections; if not, the app uses JSON storage"""
+    try:
+        socket.create_connection(
+            (os.getenv('MYSQL_HOST', 'localhost'), int(os.getenv('MYSQL_PORT', 3306))), timeout
+        ).close()
+        return True
+    except OSError:
+        return False
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5004)}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = gunicorn_workers() if mysql_reachable() else 1
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
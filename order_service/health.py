@@ -0,0 +1,82 @@
+"""
+Background dependency health monitoring.
+
+Probing customer_service and product_service inline on every /health call
+cost up to one timeout per dependency, in sequence, and tied up a worker
+while a dependency was degraded. ``DependencyMonitor`` instead probes all
+dependencies concurrently from a background thread every
+HEALTH_CHECK_INTERVAL seconds; health endpoints only read the cached result.
+
+The thread starts on first use and is restarted in a forked worker process,
+so it works with pre-forking servers.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 10))
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', 2))
+
+
+class DependencyMonitor:
+    """Probes dependencies concurrently on an interval and caches their status"""
+
+    def __init__(self, probes, interval=HEALTH_CHECK_INTERVAL, timeout=HEALTH_PROBE_TIMEOUT):
+        # name -> callable that returns normally when the dependency is healthy
+        self.probes = probes
+        self.interval = interval
+        self.timeout = timeout
+        self.status = {name: {'status': 'UNKNOWN'} for name in probes}
+        self.first_round = threading.Event()
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def ensure_started(self):
+        """Start the probe thread in this process if it is not running"""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.first_round = threading.Event()
+            threading.Thread(target=self._run, name='dependency-monitor', daemon=True).start()
+
+    def snapshot(self):
+        """Cached status per dependency; waits for the first round after startup"""
+        self.ensure_started()
+        self.first_round.wait(self.timeout + 1)
+        return {name: dict(status) for name, status in self.status.items()}
+
+    def _run(self):
+        executor = ThreadPoolExecutor(max_workers=len(self.probes), thread_name_prefix='probe')
+        while True:
+            self.check(executor)
+            self.first_round.set()
+            time.sleep(self.interval)
+
+    def check(self, executor):
+        """Run every probe concurrently and record the results"""
+        futures = {name: executor.submit(self._probe, probe) for name, probe in self.probes.items()}
+        for name, future in futures.items():
+            status = future.result()
+            previous = self.status[name].get('status')
+            if previous not in ('UNKNOWN', status['status']):
+                logger.warning(f"Dependency {name} is now {status['status']}")
+            self.status[name] = status
+
+    def _probe(self, probe):
+        start = time.perf_counter()
+        try:
+            probe(self.timeout)
+            status = {'status': 'UP'}
+        except Exception as e:
+            status = {'status': 'DOWN', 'error': str(e)}
+        status['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        status['checked_at'] = datetime.utcnow().isoformat()
+        return status
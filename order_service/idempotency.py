@@ -0,0 +1,269 @@
+"""
+Idempotency-Key support for POST /orders.
+
+A client that sends an ``Idempotency-Key`` header can retry freely: the
+first request with a key creates the order and its response is stored; any
+later request with the same key and body gets the stored response back
+(marked ``Idempotent-Replayed: true``) without touching customer_service,
+product_service or the database again.
+
+Duplicates that arrive while the first request is still running collapse
+onto it: in the same process they wait on an event, across processes they
+poll the key's row until it completes. A key reused with a different body
+is rejected with 422. Responses with a 5xx status are not stored, so the
+client's retry runs again. Keys expire after IDEMPOTENCY_TTL_HOURS.
+
+Keys live in the ``idempotency_key`` table in MySQL mode and in a separate
+JSON file in fallback mode (single process, like the rest of that mode).
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import Response, jsonify, make_response
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv('IDEMPOTENCY_TTL_HOURS', 24))
+# How long a duplicate waits for the first request before answering 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 30))
+# An IN_PROGRESS key older than this was left by a crashed worker and is taken over
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv('IDEMPOTENCY_LOCK_SECONDS', 60))
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETED = 'COMPLETED'
+
+
+def _sha256(data):
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+class SqlKeyStore:
+    """Idempotency keys in the idempotency_key table"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def claim(self, key_hash, request_hash, now):
+        """Insert an IN_PROGRESS row; return None if we own the key, else the existing row"""
+        try:
+            with self.db.engine.begin() as connection:
+                connection.execute(insert(IdempotencyKey).values(
+                    key_hash=key_hash, request_hash=request_hash, status=IN_PROGRESS, created_at=now
+                ))
+            return None
+        except IntegrityError:
+            return self.get(key_hash)
+
+    def get(self, key_hash):
+        with self.db.engine.connect() as connection:
+            row = connection.execute(
+                select(IdempotencyKey.__table__).where(IdempotencyKey.key_hash == key_hash)
+            ).mappings().first()
+        return dict(row) if row else None
+
+    def take_over(self, key_hash, record, request_hash, now):
+        """Restart an expired or abandoned key; False if another request got there first"""
+        with self.db.engine.begin() as connection:
+            result = connection.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.created_at == record['created_at'])
+                .values(request_hash=request_hash, status=IN_PROGRESS, created_at=now,
+                        response_status=None, response_body=None, order_id=None)
+            )
+        return result.rowcount == 1
+
+    def complete(self, key_hash, status, body, order_id):
+        with self.db.engine.begin() as connection:
+            connection.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key_hash == key_hash)
+                .values(status=COMPLETED, response_status=status, response_body=body, order_id=order_id)
+            )
+
+    def release(self, key_hash):
+        with self.db.engine.begin() as connection:
+            connection.execute(delete(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash))
+
+    def prune(self, before):
+        with self.db.engine.begin() as connection:
+            return connection.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < before)).rowcount
+
+
+class JsonKeyStore:
+    """Idempotency keys in a JSON file, for the JSON storage fallback"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                keys = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        for record in keys.values():
+            record['created_at'] = datetime.fromisoformat(record['created_at'])
+        return keys
+
+    def _save(self, keys):
+        with open(self.path, 'w') as f:
+            json.dump(keys, f, default=lambda value: value.isoformat())
+
+    def claim(self, key_hash, request_hash, now):
+        with self.lock:
+            keys = self._load()
+            if key_hash in keys:
+                return keys[key_hash]
+            keys[key_hash] = {'request_hash': request_hash, 'status': IN_PROGRESS, 'created_at': now,
+                              'response_status': None, 'response_body': None, 'order_id': None}
+            self._save(keys)
+            return None
+
+    def take_over(self, key_hash, record, request_hash, now):
+        with self.lock:
+            keys = self._load()
+            current = keys.get(key_hash)
+            if current is None or current['created_at'] != record['created_at']:
+                return False
+            keys[key_hash] = {'request_hash': request_hash, 'status': IN_PROGRESS, 'created_at': now,
+                              'response_status': None, 'response_body': None, 'order_id': None}
+            self._save(keys)
+            return True
+
+    def complete(self, key_hash, status, body, order_id):
+        with self.lock:
+            keys = self._load()
+            if key_hash in keys:
+                keys[key_hash].update(status=COMPLETED, response_status=status, response_body=body,
+                                      order_id=order_id)
+                self._save(keys)
+
+    def release(self, key_hash):
+        with self.lock:
+            keys = self._load()
+            if keys.pop(key_hash, None) is not None:
+                self._save(keys)
+
+    def prune(self, before):
+        with self.lock:
+            keys = self._load()
+            expired = [key for key, record in keys.items() if record['created_at'] < before]
+            for key in expired:
+                del keys[key]
+            if expired:
+                self._save(keys)
+            return len(expired)
+
+
+class IdempotentRequests:
+    """Runs a view at most once per Idempotency-Key and replays its response"""
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        # key hash -> event set when this process's first request finishes
+        self.inflight = {}
+        self.executed = 0
+        self.replayed = 0
+        self.collapsed = 0
+        self.conflicts = 0
+
+    def handle(self, key, body, view):
+        """Return the response for this request, calling ``view()`` only if needed"""
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters'}), 400
+        key_hash = _sha256(key)
+        request_hash = _sha256(body)
+
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        with self.lock:
+            event = self.inflight.get(key_hash)
+            owner = event is None
+            if owner:
+                event = self.inflight[key_hash] = threading.Event()
+        if not owner:
+            # Same-process duplicate: wait for the first request instead of polling the store
+            self.collapsed += 1
+            event.wait(IDEMPOTENCY_WAIT_SECONDS)
+        try:
+            return self._run(key_hash, request_hash, view, deadline)
+        finally:
+            if owner:
+                with self.lock:
+                    del self.inflight[key_hash]
+                event.set()
+
+    def _run(self, key_hash, request_hash, view, deadline):
+        while True:
+            now = datetime.utcnow()
+            record = self.store.claim(key_hash, request_hash, now)
+            if record is None:
+                return self._execute(key_hash, view)
+
+            age = now - record['created_at']
+            if record['status'] == COMPLETED:
+                if age > timedelta(hours=IDEMPOTENCY_TTL_HOURS):
+                    if self.store.take_over(key_hash, record, request_hash, now):
+                        return self._execute(key_hash, view)
+                    continue
+                if record['request_hash'] != request_hash:
+                    self.conflicts += 1
+                    return jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422
+                self.replayed += 1
+                return Response(
+                    record['response_body'],
+                    status=record['response_status'],
+                    mimetype='application/json',
+                    headers={'Idempotent-Replayed': 'true'},
+                )
+
+            if age > timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS):
+                logger.warning(f"Taking over abandoned idempotency key {key_hash[:12]}")
+                if self.store.take_over(key_hash, record, request_hash, now):
+                    return self._execute(key_hash, view)
+                continue
+            if time.monotonic() >= deadline:
+                self.conflicts += 1
+                return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+            # First request is running in another process
+            time.sleep(POLL_INTERVAL)
+
+    def _execute(self, key_hash, view):
+        self.executed += 1
+        try:
+            response = make_response(view())
+        except Exception:
+            self.store.release(key_hash)
+            raise
+        if response.status_code >= 500:
+            # Transient failure (e.g. an upstream was down): let the retry run again
+            self.store.release(key_hash)
+            return response
+        body = response.get_data(as_text=True)
+        payload = response.get_json(silent=True)
+        order_id = payload.get('id') if response.status_code == 201 and isinstance(payload, dict) else None
+        self.store.complete(key_hash, response.status_code, body, order_id)
+        return response
+
+    def prune(self):
+        return self.store.prune(datetime.utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS))
+
+    def stats(self):
+        return {
+            'executed': self.executed,
+            'replayed': self.replayed,
+            'collapsed': self.collapsed,
+            'conflicts': self.conflicts,
+        }
@@ -8,6 +8,11 @@ Models:
 ------
 - Order: Represents an order in the system
 - OrderItem: Represents individual items within an order
+- IdempotencyKey: Stored outcome of a POST /orders request, keyed by its
+  Idempotency-Key header
+
+orders_json() encodes the order list straight from result tuples for the
+GET /orders hot path; to_dict() remains the per-object representation.
 
 Author: Dennis
 Version: 1.0.0
@@ -16,6 +21,8 @@ Date: March 2024
 
 from database import db
 from datetime import datetime
+from sqlalchemy import select
+from eai_common.fast_json import dumps
 
 class Order(db.Model):
     """
@@ -91,4 +98,76 @@ class OrderItem(db.Model):
             'quantity': self.quantity,
             'unit_price': self.unit_price,
             'total': self.quantity * self.unit_price
-        }
\ No newline at end of file
+        }
+
+class IdempotencyKey(db.Model):
+    """
+    IdempotencyKey Model
+
+    Remembers the response to a POST /orders request so a client retry with
+    the same Idempotency-Key header gets the same response instead of a
+    duplicate order. The primary key is the SHA-256 of the header value:
+    fixed width, so lookups are a single short B-tree probe.
+
+    Attributes:
+        key_hash (str): SHA-256 hex digest of the Idempotency-Key header
+        request_hash (str): SHA-256 hex digest of the request body
+        status (str): IN_PROGRESS while the first request runs, then COMPLETED
+        response_status (int): HTTP status of the stored response
+        response_body (str): Body of the stored response
+        order_id (int): ID of the created order, if any
+        created_at (datetime): When the key was first seen
+    """
+    __tablename__ = 'idempotency_key'
+
+    key_hash = db.Column(db.String(64), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='IN_PROGRESS')
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    order_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+ORDER_COLUMNS = (Order.id, Order.customer_id, Order.created_at, Order.updated_at, Order.status, Order.total_amount)
+ORDER_ITEM_COLUMNS = (OrderItem.id, OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price)
+
+def orders_json(session):
+    """
+    Encode all orders with their items as JSON bytes, in the shape of
+    Order.to_dict().
+
+    Runs two queries (orders, then all items) instead of loading each
+    order's items lazily, and works on result tuples instead of ORM objects.
+
+    Args:
+        session: SQLAlchemy session to query with
+
+    Returns:
+        bytes: JSON array of orders
+    """
+    orders = {}
+    for order_id, customer_id, created_at, updated_at, status, total_amount in session.execute(
+        select(*ORDER_COLUMNS).order_by(Order.id)
+    ):
+        orders[order_id] = {
+            'id': order_id,
+            'customer_id': customer_id,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'status': status,
+            'total_amount': total_amount,
+            'items': [],
+        }
+    for order_id, item_id, product_id, quantity, unit_price in session.execute(
+        select(OrderItem.order_id, *ORDER_ITEM_COLUMNS).order_by(OrderItem.order_id, OrderItem.id)
+    ):
+        order = orders.get(order_id)
+        if order is not None:
+            order['items'].append({
+                'id': item_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'total': quantity * unit_price,
+            })
+    return dumps(list(orders.values()))
@@ -0,0 +1,209 @@
+"""
+Circuit breakers and bulkheads for outbound calls.
+
+Every upstream (customer_service, product_service) is reached through an
+``Upstream``, which combines:
+
+- a ``Bulkhead``: at most N concurrent calls to that upstream; extra callers
+  wait up to ``max_wait`` seconds and are then rejected, so a slow
+  dependency cannot occupy every worker thread;
+- a ``CircuitBreaker``: after ``failure_threshold`` consecutive failures
+  (connection errors, timeouts, 5xx) the circuit opens and calls fail
+  immediately for ``reset_timeout`` seconds; then a single trial call is let
+  through (half-open) and its outcome closes or re-opens the circuit.
+
+Rejections raise subclasses of ``requests.RequestException``, so existing
+error handling treats them like any other unavailable upstream, just
+without waiting for timeouts and retries. ``FallbackCache`` keeps the last
+good answer per key (e.g. product prices) for callers that can degrade.
+"""
+import threading
+import time
+from collections import OrderedDict
+import requests
+
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+
+class CircuitOpenError(requests.RequestException):
+    """The upstream's circuit is open; the call was not attempted"""
+
+
+class BulkheadFullError(requests.RequestException):
+    """Too many calls to the upstream are already in flight"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead"""
+        with self.lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f'{self.name} circuit is open; failing fast')
+
+    def cancel_call(self):
+        """The call allowed by before_call() was not made"""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+            self.state = CLOSED
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'successes': self.successes,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'times_opened': self.times_opened,
+            }
+
+
+class Bulkhead:
+    def __init__(self, name, max_concurrent=10, max_wait=0.5):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.rejected = 0
+
+    def __enter__(self):
+        if not self.semaphore.acquire(timeout=self.max_wait):
+            with self.lock:
+                self.rejected += 1
+            raise BulkheadFullError(f'{self.name} has {self.max_concurrent} calls in flight; rejecting')
+        with self.lock:
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.active -= 1
+        self.semaphore.release()
+
+    def stats(self):
+        return {'max_concurrent': self.max_concurrent, 'active': self.active, 'rejected': self.rejected}
+
+
+class Upstream:
+    """A requests session guarded by a bulkhead and a circuit breaker"""
+
+    def __init__(self, name, session, breaker, bulkhead):
+        self.name = name
+        self.session = session
+        self.breaker = breaker
+        self.bulkhead = bulkhead
+
+    def request(self, method, url, **kwargs):
+        self.breaker.before_call()
+        try:
+            with self.bulkhead:
+                response = self.session.request(method, url, **kwargs)
+        except BulkheadFullError:
+            # Not the upstream's fault; leave the breaker as it is
+            self.breaker.cancel_call()
+            raise
+        except Exception:
+            # Connection errors and timeouts, but also anything else the call
+            # raised; either way a half-open trial must not stay in flight
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Interrupted (e.g. a gevent timeout): no verdict on the upstream
+            self.breaker.cancel_call()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        return {'circuit': self.breaker.stats(), 'bulkhead': self.bulkhead.stats()}
+
+
+class FallbackCache:
+    """
+    Last good value per key, served when the upstream is unavailable.
+
+    Holds at most ``max_entries`` keys; the least recently used is evicted.
+    """
+
+    def __init__(self, max_age, max_entries=10000):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key):
+        """Return the cached value if it is younger than max_age, else None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.max_age:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def stats(self):
+        return {'size': len(self.entries), 'max_entries': self.max_entries, 'max_age': self.max_age,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
@@ -15,11 +15,43 @@ Version: 1.0.0
 Date: March 2024
 """
 
-from flask import Flask, request, jsonify
-from flask_sqlalchemy import SQLAlchemy
+from flask import Blueprint, Flask, Response, request, jsonify, stream_with_context
 from database import db
 from models import Product
+from sqlalchemy import select
+from catalog import (
+    ResponseCache,
+    as_utc,
+    catalog_etag,
+    catalog_version,
+    init_catalog,
+    product_etag,
+)
+from outbox import (
+    DEFAULT_BATCH,
+    MAX_BATCH,
+    OutboxGone,
+    OutboxPruner,
+    init_outbox,
+    latest_seq,
+    prune_outbox,
+    wait_for_events,
+)
+from pricing import HISTORY_QUERY, MAX_CART_ITEMS, init_price_history, parse_timestamp, price_cart
+from eai_common.fast_json import FastJSONProvider, rows_json
+from sqlite_tuning import apply_profile, begin_transactions, profile_pragmas, readonly_url
+from bulk import MAX_BULK_PRODUCTS, parse_ndjson, upsert_products, validate_rows
+from search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, init_search, search_products
+from pagination import (
+    PRODUCT_FIELDS,
+    clamp_page_size,
+    next_cursor,
+    parse_fields,
+    parse_number,
+    product_page_query,
+)
 import os
+import json
 import logging
 from datetime import datetime
 
@@ -35,15 +67,54 @@ DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
 DB_FILE = 'products.db'
 DB_PATH = os.path.join(DB_DIR, DB_FILE)
 
-# Ensure instance directory exists
-os.makedirs(DB_DIR, exist_ok=True)
+# SQLite PRAGMAs applied to every connection (see sqlite_tuning.py)
+SQLITE_PRAGMAS = profile_pragmas()
+# GET endpoints read through a separate pool of read-only connections; with
+# WAL they run concurrently with the single writer instead of queueing
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', 8))
+
+# Routes are registered on the app by create_app()
+bp = Blueprint('products', __name__)
+
+# Clients may reuse a product response this long before revalidating with
+# If-None-Match, which is answered with 304 while the catalog is unchanged
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 5))
+
+# Change events are kept this long for consumers to catch up
+OUTBOX_RETENTION_HOURS = int(os.getenv('OUTBOX_RETENTION_HOURS', 24))
+# ... and pruned after a write at most this often (seconds), in every worker
+OUTBOX_PRUNE_INTERVAL = float(os.getenv('OUTBOX_PRUNE_INTERVAL', 300))
+# Interval between SSE keep-alive comments on an idle change stream
+CHANGE_STREAM_HEARTBEAT = float(os.getenv('CHANGE_STREAM_HEARTBEAT', 15))
+
+# Serialized GET /products bodies for the current catalog version
+listing_cache = ResponseCache()
+outbox_pruner = OutboxPruner(OUTBOX_RETENTION_HOURS, OUTBOX_PRUNE_INTERVAL)
+
+def read_connection():
+    """Connection from the read-only pool, for GET endpoints"""
+    return db.engines['readonly'].connect()
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def cache_headers(response, etag, last_modified):
+    """Attach validators and Cache-Control; turn the response into a 304 if they match"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = HTTP_CACHE_MAX_AGE
+    return response.make_conditional(request)
 
-# Initialize database
-db.init_app(app)
+def prune_outbox_if_due():
+    """Called after a committed write; a failed prune never fails the write"""
+    try:
+        pruned = outbox_pruner.maybe_prune(db.engine)
+        if pruned:
+            logger.info(f"Pruned {pruned} product change events")
+    except Exception as e:
+        logger.error(f"Error pruning product change events: {e}")
+
+def not_modified(etag, last_modified):
+    return cache_headers(Response(status=304), etag, last_modified)
 
 def validate_product_data(data, check_required=True):
     """Validate product input data"""
@@ -67,12 +138,14 @@ def validate_product_data(data, check_required=True):
         
     return True, None
 
-@app.route('/health', methods=['GET'])
+@bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
-        # Try a simple database query
-        Product.query.limit(1).all()
+        # Try a simple database query; through the read pool, so it does not
+        # queue behind a writer for the write lock
+        with read_connection() as connection:
+            connection.execute(select(Product.id).limit(1)).all()
         db_status = "UP"
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
@@ -86,35 +159,223 @@ def health_check():
     
     return jsonify(health)
 
-@app.route('/products', methods=['GET'])
+@bp.route('/products', methods=['GET'])
 def get_products():
-    """Get all products"""
+    """
+    Get products, optionally one page at a time.
+
+    Query parameters: category, min_price, max_price, sort (id, price, name;
+    prefix '-' for descending), fields (e.g. id,price), limit and after.
+    Without limit or after every matching product is returned. With either,
+    the response is one page (limit defaults to 100, max 1000); pass the
+    X-Next-Cursor response header back as `after` to fetch the next page,
+    the header is absent on the last page.
+    """
+    args = request.args
+    paginated = 'limit' in args or 'after' in args
     try:
-        category = request.args.get('category')
-        query = Product.query
-        
-        if category:
-            query = query.filter_by(category=category)
-            
-        products = query.all()
-        logger.info(f"Retrieved {len(products)} products")
-        return jsonify([p.to_dict() for p in products])
+        limit = clamp_page_size(parse_number(args.get('limit'), 'limit', int)) if paginated else None
+        fields = parse_fields(args.get('fields'))
+        query, sort_name = product_page_query(
+            limit,
+            after=args.get('after'),
+            sort=args.get('sort'),
+            category=args.get('category'),
+            min_price=parse_number(args.get('min_price'), 'min_price'),
+            max_price=parse_number(args.get('max_price'), 'max_price'),
+            fields=fields,
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with read_connection() as connection:
+            version, updated_at = catalog_version(connection)
+            etag = catalog_etag(version)
+            if request.if_none_match.contains(etag):
+                return not_modified(etag, updated_at)
+
+            key = request.query_string
+            cached = listing_cache.get(version, key)
+            if cached is None:
+                rows = connection.execute(query).all()
+                has_next_page = paginated and len(rows) > limit
+                if paginated:
+                    rows = rows[:limit]
+                body = rows_json(fields, rows)
+                headers = {}
+                if has_next_page:
+                    headers['X-Next-Cursor'] = next_cursor(rows[-1], sort_name)
+                listing_cache.put(version, key, body, headers)
+                logger.info(f"Retrieved {len(rows)} products")
+            else:
+                body, headers = cached
+
+        response = Response(body, mimetype='application/json', headers=headers)
+        return cache_headers(response, etag, updated_at)
     except Exception as e:
         logger.error(f"Error fetching products: {e}")
         return jsonify({'error': 'Failed to fetch products'}), 500
 
-@app.route('/products/<int:product_id>', methods=['GET'])
+@bp.route('/products/search', methods=['GET'])
+def search():
+    """
+    Full-text search over product name, sku and category.
+
+    Every word in `q` must match as a prefix (q=pyth prog finds "Python
+    Programming"); results are ordered by relevance. `limit` defaults to 20,
+    max 100.
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'q is required'}), 400
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+
+    try:
+        with read_connection() as connection:
+            rows = search_products(connection, q, min(limit, MAX_SEARCH_LIMIT))
+        logger.info(f"Search '{q}' returned {len(rows)} products")
+        return jsonify([dict(row) for row in rows])
+    except Exception as e:
+        logger.error(f"Error searching products for '{q}': {e}")
+        return jsonify({'error': 'Search failed'}), 500
+
+def changes_position():
+    """Parse `after`; without it a consumer starts from the current end of the stream"""
+    after = request.args.get('after', type=int)
+    if after is None and 'after' in request.args:
+        raise ValueError('after must be an integer')
+    if after is None:
+        with read_connection() as connection:
+            return latest_seq(connection)
+    if after < 0:
+        raise ValueError('after must be non-negative')
+    return after
+
+@bp.route('/products/changes', methods=['GET'])
+def get_product_changes():
+    """
+    Long-poll product change events.
+
+    Returns events with seq > `after` (oldest first, at most `limit`) and
+    the position to pass as `after` next time. With `wait` (seconds, max 30)
+    the request blocks until an event arrives. Answers 410 when `after` is
+    older than the retained history; the consumer should then drop its cache
+    and restart without `after`.
+    """
+    try:
+        after = changes_position()
+        limit = min(request.args.get('limit', DEFAULT_BATCH, type=int), MAX_BATCH)
+        wait = request.args.get('wait', 0.0, type=float)
+        events = wait_for_events(read_connection, after, max(limit, 1), max(wait, 0.0))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except OutboxGone:
+        return jsonify({'error': f'Changes after {after} are no longer retained; resync'}), 410
+    return jsonify({
+        'events': events,
+        'last_seq': events[-1]['seq'] if events else after,
+    })
+
+@bp.route('/products/changes/stream', methods=['GET'])
+def stream_product_changes():
+    """
+    Server-sent events of product changes; each event id is its seq, so a
+    reconnecting EventSource resumes from Last-Event-ID.
+    """
+    try:
+        if request.headers.get('Last-Event-ID', '').isdigit():
+            after = int(request.headers['Last-Event-ID'])
+        else:
+            after = changes_position()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate(after):
+        while True:
+            try:
+                events = wait_for_events(read_connection, after, MAX_BATCH, CHANGE_STREAM_HEARTBEAT)
+            except OutboxGone:
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            if not events:
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            after = events[-1]['seq']
+
+    return Response(
+        stream_with_context(generate(after)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'},
+    )
+
+@bp.route('/products/prices', methods=['POST'])
+def price_cart_at():
+    """
+    Price a cart as of a point in time.
+
+    Body: {"at": ISO 8601 timestamp (default now), "items": [{"sku" or
+    "product_id", "quantity"}, ...]}. Each line gets the unit price that was
+    in effect at `at`; lines without one carry an error and are left out of
+    the total.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+        return jsonify({'error': 'Expected an object with an items array'}), 400
+    if len(data['items']) > MAX_CART_ITEMS:
+        return jsonify({'error': f'At most {MAX_CART_ITEMS} items per request'}), 400
+    try:
+        at = parse_timestamp(data.get('at'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'at must be an ISO 8601 timestamp'}), 400
+
+    with read_connection() as connection:
+        lines, total = price_cart(connection, data['items'], at)
+    return jsonify({
+        'at': at,
+        'items': lines,
+        'total': total,
+        'unpriced': sum(1 for line in lines if 'error' in line),
+    })
+
+@bp.route('/products/<int:product_id>/prices', methods=['GET'])
+def get_price_history(product_id):
+    """
+    Price changes of a product, oldest first; a null price marks its deletion,
+    or the end of a SKU it was renamed from
+    """
+    with read_connection() as connection:
+        rows = connection.execute(HISTORY_QUERY, {'product_id': product_id}).mappings().all()
+    if not rows:
+        return jsonify({'error': 'Product not found'}), 404
+    return jsonify([dict(row) for row in rows])
+
+@bp.route('/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     """Get a specific product"""
     try:
-        product = Product.query.get_or_404(product_id)
+        with read_connection() as connection:
+            product = connection.execute(
+                select(Product.__table__).where(Product.id == product_id)
+            ).mappings().first()
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 404
+        etag = product_etag(product_id, product['version'])
+        last_modified = as_utc(product['updated_at'])
+        if request.if_none_match.contains(etag):
+            return not_modified(etag, last_modified)
         logger.info(f"Retrieved product {product_id}")
-        return jsonify(product.to_dict())
+        response = jsonify({field: product[field] for field in PRODUCT_FIELDS})
+        return cache_headers(response, etag, last_modified)
     except Exception as e:
         logger.error(f"Error fetching product {product_id}: {e}")
         return jsonify({'error': 'Product not found'}), 404
 
-@app.route('/products', methods=['POST'])
+@bp.route('/products', methods=['POST'])
 def create_product():
     """Create a new product"""
     logger.info("Received request to create product")
@@ -144,6 +405,7 @@ def create_product():
         
         db.session.add(new_product)
         db.session.commit()
+        prune_outbox_if_due()
         
         logger.info(f"Successfully created product with ID {new_product.id}")
         return jsonify(new_product.to_dict()), 201
@@ -153,7 +415,42 @@ def create_product():
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-@app.route('/products/<int:product_id>', methods=['PUT'])
+@bp.route('/products/bulk', methods=['POST'])
+def bulk_upsert_products():
+    """
+    Create or update many products by SKU in one transaction.
+
+    Accepts a JSON array, or NDJSON (one product per line) with
+    Content-Type application/x-ndjson. Invalid rows are skipped and reported;
+    the response lists a result for every input row in input order.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        items = list(parse_ndjson(request.stream))
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            return jsonify({'error': 'Expected a JSON array of products or an NDJSON body'}), 400
+    if len(items) > MAX_BULK_PRODUCTS:
+        return jsonify({'error': f'At most {MAX_BULK_PRODUCTS} products per request'}), 400
+
+    rows, results = validate_rows(items, validate_product_data)
+    try:
+        results.extend(upsert_products(db.session, rows))
+        db.session.commit()
+        prune_outbox_if_due()
+    except Exception as e:
+        logger.error(f"Error in bulk upsert: {e}")
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    results.sort(key=lambda result: result['index'])
+    summary = {status: 0 for status in ('created', 'updated', 'unchanged', 'error')}
+    for result in results:
+        summary[result['status']] += 1
+    logger.info(f"Bulk upsert of {len(items)} products: {summary}")
+    return jsonify({'summary': summary, 'results': results})
+
+@bp.route('/products/<int:product_id>', methods=['PUT'])
 def update_product(product_id):
     """Update a product"""
     try:
@@ -176,6 +473,7 @@ def update_product(product_id):
         product.price = float(data.get('price', product.price))
         
         db.session.commit()
+        prune_outbox_if_due()
         
         logger.info(f"Updated product {product_id}")
         return jsonify(product.to_dict())
@@ -185,13 +483,14 @@ def update_product(product_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-@app.route('/products/<int:product_id>', methods=['DELETE'])
+@bp.route('/products/<int:product_id>', methods=['DELETE'])
 def delete_product(product_id):
     """Delete a product"""
     try:
         product = Product.query.get_or_404(product_id)
         db.session.delete(product)
         db.session.commit()
+        prune_outbox_if_due()
         
         logger.info(f"Deleted product {product_id}")
         return jsonify({"message": "Product deleted"})
@@ -242,22 +541,73 @@ def init_sample_products():
         logger.error(f"Error initializing sample products: {str(e)}")
         db.session.rollback()
 
-# Create database and initialize sample data
-with app.app_context():
-    try:
-        # Always create tables
-        db.create_all()
-        logger.info(f"Database initialized at {DB_PATH}")
-        
-        # Initialize sample products if none exist
-        if Product.query.count() == 0:
-            init_sample_products()
-            
-    except Exception as e:
-        logger.error(f"Database initialization error: {e}")
-        raise
+def init_database():
+    """
+    Create the schema, triggers and indexes, prune old change events and seed
+    sample products into an empty catalog. Idempotent; runs once per
+    deployment (`flask --app app init-db`), not in every worker.
+    """
+    os.makedirs(DB_DIR, exist_ok=True)
+    # Always create tables (the read-only bind has none of its own)
+    db.create_all(bind_key=None)
+    # Version columns, catalog version row and the triggers that bump them
+    with db.engine.begin() as connection:
+        init_catalog(connection)
+        init_outbox(connection)
+        backfilled, closed = init_price_history(connection)
+        if backfilled:
+            logger.info(f"Backfilled price history for {backfilled} products")
+        if closed:
+            logger.info(f"Closed price history of {closed} renamed SKUs")
+        pruned = prune_outbox(connection, OUTBOX_RETENTION_HOURS)
+        if pruned:
+            logger.info(f"Pruned {pruned} product change events")
+    # create_all skips indexes on tables that already exist
+    for index in Product.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    # FTS index and the triggers that keep it in sync with product
+    with db.engine.begin() as connection:
+        init_search(connection)
+    logger.info(f"Database initialized at {DB_PATH} with PRAGMAs {SQLITE_PRAGMAS}")
+    init_sample_products()
+
+def create_app():
+    """
+    Build the Flask app. Cheap and free of database I/O, so WSGI workers
+    (e.g. `gunicorn 'app:create_app()'`) start quickly; the schema must
+    already exist, see init_database().
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
+    app.config['SQLALCHEMY_BINDS'] = {
+        'readonly': {
+            'url': readonly_url(DB_PATH),
+            'pool_size': DB_READ_POOL_SIZE,
+            'max_overflow': DB_READ_POOL_SIZE,
+        }
+    }
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(app)
+    with app.app_context():
+        apply_profile(db.engine, SQLITE_PRAGMAS)
+        begin_transactions(db.engine)
+        apply_profile(db.engines['readonly'], SQLITE_PRAGMAS, readonly=True)
+
+    app.register_blueprint(bp)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create or upgrade the product database and seed sample data."""
+        init_database()
+
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_database()
     app.run(host='0.0.0.0', port=5002, debug=True)
     
 # SKU stands for Stock Keeping Unit.
@@ -0,0 +1,104 @@
+"""
+Product search benchmark: FTS5 index vs a naive LIKE scan.
+
+    python bench_search.py --products 500000 --db /tmp/products_search_bench.db
+
+Builds (or reuses) a synthetic catalog in a scratch SQLite file, then times
+``search_products`` against ``name/sku/category LIKE '%term%'`` for a few
+typical storefront queries. Titles draw from a Zipf-distributed vocabulary of
+generated words plus common subject words, and SKUs are ISBN-like, so term
+frequencies resemble a real catalog.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from sqlalchemy import create_engine, func, insert, select, text
+from models import Product
+from search import init_search, search_products
+
+WORDS = (
+    "python data science history art music garden ocean river mountain night "
+    "secret empire kingdom shadow light winter summer journey machine learning "
+    "cooking travel poetry war peace love death life city forest dragon star "
+    "systems design patterns guide handbook introduction advanced modern classic"
+).split()
+CATEGORIES = ["Fiction", "Technology", "History", "Science", "Art", "Cooking", "Travel", "Poetry"]
+SYLLABLES = "ka lo mi ren sa tor vel din ar po lu shi mar qen tis bel ova dra cor fen".split()
+QUERIES = ["python", "drag", "machine learning", "secret kingdom", "9780000012", "zzzz"]
+
+LIKE_QUERY = text("""
+    SELECT id, name, sku, category, price FROM product
+    WHERE name LIKE :pattern OR sku LIKE :pattern OR category LIKE :pattern
+    LIMIT 20
+""")
+
+
+def seed(engine, count):
+    Product.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        init_search(conn)
+        existing = conn.execute(select(func.count()).select_from(Product)).scalar()
+    if existing >= count:
+        return existing
+    rng = random.Random(42)
+    vocabulary = WORDS + [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(20000)
+    ]
+    rng.shuffle(vocabulary)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    batch = []
+    start = time.perf_counter()
+    for i in range(existing, count):
+        batch.append({
+            "name": " ".join(rng.choices(vocabulary, weights, k=rng.randint(2, 5))).title(),
+            "sku": f"978{i:010d}",
+            "category": rng.choice(CATEGORIES),
+            "price": round(rng.uniform(1, 100), 2),
+        })
+        if len(batch) == 10000:
+            with engine.begin() as conn:
+                conn.execute(insert(Product), batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(Product), batch)
+    print(f"Seeded {count - existing} products (FTS kept in sync by triggers) in {time.perf_counter() - start:.1f}s")
+    return count
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product search")
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--db", default=os.path.join("/tmp", "products_search_bench.db"))
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    total = seed(engine, args.products)
+    print(f"{total} products in {args.db}\n")
+    print(f"{'query':<20} {'fts ms':>9} {'hits':>5} {'like ms':>9} {'hits':>5} {'speedup':>8}")
+
+    with engine.connect() as conn:
+        for query in QUERIES:
+            fts_ms, fts_hits = timed(lambda: search_products(conn, query), args.iterations)
+            # LIKE only handles the whole string as one substring
+            like_ms, like_hits = timed(
+                lambda: conn.execute(LIKE_QUERY, {"pattern": f"%{query}%"}).all(),
+                max(1, args.iterations // 4),
+            )
+            print(f"{query:<20} {fts_ms:9.2f} {fts_hits:5d} {like_ms:9.2f} {like_hits:5d} {like_ms / fts_ms:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Serialization cost of the product list, per 10k products.
+
+    python bench_serialization.py --products 10000 --repeat 5
+    JSON_ENCODER=stdlib python bench_serialization.py   # without orjson
+
+Compares the previous path (ORM objects -> to_dict() -> Flask's default
+encoder, which sorts keys) with to_dict() through the fast encoder and with
+the row path GET /products uses (result tuples -> rows_json). Each case is
+timed end to end (query + encode) and encode only.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from eai_common.fast_json import JSON_ENCODER, dumps, rows_json
+from models import Product
+from pagination import PRODUCT_FIELDS
+
+CATEGORIES = ["Fiction", "Technology", "History", "Science", "Art"]
+
+
+def flask_default_dumps(obj):
+    # What jsonify did with DefaultJSONProvider outside debug mode
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+
+
+def seed(engine, count):
+    Product.__table__.create(engine)
+    rows = [
+        {
+            "name": f"Book {i}",
+            "sku": f"SKU-{i:07d}",
+            "category": random.choice(CATEGORIES),
+            "price": round(random.uniform(1, 100), 2),
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Product), rows)
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product list serialization benchmark")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="products_bench_"), "products.db")
+    engine = create_engine(f"sqlite:///{path}")
+    seed(engine, args.products)
+    columns = [getattr(Product, field) for field in PRODUCT_FIELDS]
+
+    def load_objects():
+        with Session(engine) as session:
+            return session.scalars(select(Product)).all()
+
+    def load_rows():
+        with engine.connect() as conn:
+            return conn.execute(select(*columns)).all()
+
+    objects = load_objects()
+    rows = load_rows()
+    cases = [
+        ("to_dict + flask default (before)",
+         lambda: flask_default_dumps([p.to_dict() for p in load_objects()]),
+         lambda: flask_default_dumps([p.to_dict() for p in objects])),
+        (f"to_dict + {JSON_ENCODER}",
+         lambda: dumps([p.to_dict() for p in load_objects()]),
+         lambda: dumps([p.to_dict() for p in objects])),
+        (f"rows_json + {JSON_ENCODER}",
+         lambda: rows_json(PRODUCT_FIELDS, load_rows()),
+         lambda: rows_json(PRODUCT_FIELDS, rows)),
+    ]
+
+    scale = 10000 / args.products
+    print(f"{args.products} products, best of {args.repeat}; times per 10k products")
+    print(f"{'path':<36} {'query+encode':>13} {'encode':>10} {'bytes':>10}")
+    for name, end_to_end, encode_only in cases:
+        total, body = best_of(args.repeat, end_to_end)
+        encode, _ = best_of(args.repeat, encode_only)
+        print(f"{name:<36} {total * scale * 1000:10.1f} ms {encode * scale * 1000:7.1f} ms {len(body):10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Read throughput during sustained writes, per SQLite profile.
+
+    python bench_sqlite_concurrency.py --seconds 10 --readers 8 --writers 2
+
+For each profile a scratch database is seeded, then writer threads commit
+small update/insert transactions while reader threads run the GET /products
+listing and lookup queries through a read-only pool, as the service does.
+pysqlite's built-in 5 s timeout is disabled so only the profile's
+busy_timeout decides whether a blocked statement waits or fails.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, insert, select, update
+from models import Product
+from pagination import product_page_query
+from sqlite_tuning import PROFILES, apply_profile, profile_pragmas, readonly_url
+
+CATEGORIES = ["Fiction", "Technology", "History", "Science", "Art"]
+
+
+def make_engines(path, profile, pool_size):
+    pragmas = profile_pragmas(profile)
+    writer = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+    apply_profile(writer, pragmas)
+    reader = create_engine(
+        readonly_url(path),
+        connect_args={"timeout": 0},
+        pool_size=pool_size,
+        max_overflow=pool_size,
+    )
+    apply_profile(reader, pragmas, readonly=True)
+    return writer, reader
+
+
+def seed(engine, count):
+    Product.__table__.create(engine)
+    rows = [
+        {
+            "name": f"Book {i}",
+            "sku": f"SKU-{i}",
+            "category": random.choice(CATEGORIES),
+            "price": round(random.uniform(1, 100), 2),
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Product), rows)
+
+
+def run(profile, args):
+    path = os.path.join(tempfile.mkdtemp(prefix="products_bench_"), "products.db")
+    writer, reader = make_engines(path, profile, args.readers)
+    seed(writer, args.products)
+
+    stop = time.monotonic() + args.seconds
+    counts = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def read_loop():
+        while time.monotonic() < stop:
+            try:
+                with reader.connect() as conn:
+                    if random.random() < 0.5:
+                        query, _ = product_page_query(100, sort="-price", category=random.choice(CATEGORIES))
+                        conn.execute(query).all()
+                    else:
+                        conn.execute(
+                            select(Product.__table__).where(Product.id == random.randint(1, args.products))
+                        ).first()
+                bump("reads")
+            except Exception:
+                bump("read_errors")
+
+    def write_loop(worker):
+        sequence = 0
+        while time.monotonic() < stop:
+            try:
+                with writer.begin() as conn:
+                    conn.execute(
+                        update(Product)
+                        .where(Product.id == random.randint(1, args.products))
+                        .values(price=round(random.uniform(1, 100), 2))
+                    )
+                    sequence += 1
+                    conn.execute(insert(Product).values(
+                        name=f"New {worker}-{sequence}",
+                        sku=f"NEW-{worker}-{sequence}",
+                        category=random.choice(CATEGORIES),
+                        price=9.99,
+                    ))
+                bump("writes")
+            except Exception:
+                bump("write_errors")
+
+    threads = [threading.Thread(target=read_loop) for _ in range(args.readers)]
+    threads += [threading.Thread(target=write_loop, args=(i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.dispose()
+    reader.dispose()
+
+    print(
+        f"{profile:<12} reads/s {counts['reads'] / args.seconds:9.0f}  "
+        f"writes/s {counts['writes'] / args.seconds:7.0f}  "
+        f"read errors {counts['read_errors']:6d}  write errors {counts['write_errors']:6d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite read throughput under write load")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    args = parser.parse_args()
+
+    for profile in args.profiles.split(","):
+        run(profile, args)
+
+
+if __name__ == "__main__":
+    main()
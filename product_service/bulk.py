@@ -0,0 +1,121 @@
+"""
+Bulk product upsert.
+
+Rows are validated in one pass up front, then written with
+``INSERT ... ON CONFLICT(sku) DO UPDATE`` in batched executemany calls inside
+a single transaction. Invalid rows are reported and skipped; if a batch
+fails in the database it is retried row by row under savepoints so only the
+offending rows are rejected.
+
+Rows whose name, category and price already match are left untouched (and
+reported as ``unchanged``), so re-importing an unchanged catalog does not
+bump row or catalog versions, record price history or emit change events.
+"""
+import json
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.sqlite import insert
+from models import Product
+
+BATCH_SIZE = 1000
+MAX_BULK_PRODUCTS = 50000
+
+_upsert = insert(Product)
+UPSERT = _upsert.on_conflict_do_update(
+    index_elements=[Product.sku],
+    set_={
+        "name": _upsert.excluded.name,
+        "category": _upsert.excluded.category,
+        "price": _upsert.excluded.price,
+    },
+    where=or_(
+        Product.name.is_distinct_from(_upsert.excluded.name),
+        Product.category.is_distinct_from(_upsert.excluded.category),
+        Product.price.is_distinct_from(_upsert.excluded.price),
+    ),
+)
+
+
+def parse_ndjson(lines):
+    """Yield one item per non-empty NDJSON line; bad JSON becomes an error marker"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON: {e}")
+
+
+def validate_rows(items, validate):
+    """
+    Split items into writable rows and per-row errors.
+
+    Returns (rows, results) where rows are (index, values) pairs and results
+    holds an entry for every rejected item.
+    """
+    rows = []
+    results = []
+    for index, item in enumerate(items):
+        if isinstance(item, Exception):
+            results.append({"index": index, "status": "error", "error": str(item)})
+            continue
+        if not isinstance(item, dict):
+            results.append({"index": index, "status": "error", "error": "each product must be an object"})
+            continue
+        is_valid, error = validate(item)
+        if not is_valid:
+            results.append({"index": index, "sku": item.get("sku"), "status": "error", "error": error})
+            continue
+        rows.append((index, {
+            "name": item["name"],
+            "sku": str(item["sku"]),
+            "category": item["category"],
+            "price": float(item["price"]),
+        }))
+    return rows, results
+
+
+def upsert_products(session, rows):
+    """Write validated rows in batches; return per-row results"""
+    results = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        skus = [values["sku"] for _, values in batch]
+        existing = {
+            row.sku: (row.name, row.category, row.price)
+            for row in session.execute(
+                select(Product.sku, Product.name, Product.category, Product.price).where(Product.sku.in_(skus))
+            )
+        }
+        try:
+            with session.begin_nested():
+                session.execute(UPSERT, [values for _, values in batch])
+        except Exception:
+            # Isolate the failing rows instead of rejecting the whole batch
+            for index, values in batch:
+                try:
+                    with session.begin_nested():
+                        session.execute(UPSERT, values)
+                except Exception as e:
+                    error = str(getattr(e, "orig", e))
+                    results.append({"index": index, "sku": values["sku"], "status": "error", "error": error})
+                else:
+                    results.append(_result(index, values, existing))
+            continue
+        for index, values in batch:
+            results.append(_result(index, values, existing))
+    return results
+
+
+def _result(index, values, existing):
+    """Result for a written row; remembers its values for later rows with the same SKU"""
+    previous = existing.get(values["sku"])
+    current = existing[values["sku"]] = (values["name"], values["category"], values["price"])
+    if previous is None:
+        status = "created"
+    elif previous == current:
+        status = "unchanged"
+    else:
+        status = "updated"
+    return {"index": index, "sku": values["sku"], "status": status}
@@ -0,0 +1,134 @@
+"""
+Catalog versioning and HTTP caching for product reads.
+
+Every product row carries a ``version`` and ``updated_at``, and the single
+``catalog_version`` row counts changes to the whole catalog. Both are bumped
+by triggers, so every writer (API, bulk upsert, manual SQL) invalidates
+caches without application code having to remember to.
+
+GET handlers derive ETags from these versions and answer ``If-None-Match``
+with 304 before running the listing query. Listing bodies are serialized
+once per (catalog version, query string) and kept in a small LRU, so pollers
+of an unchanged catalog cost one indexed read and a dict lookup.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from sqlalchemy import text
+
+# Columns added to product after the first release; existing databases get
+# them through ALTER TABLE at startup
+PRODUCT_COLUMNS = {
+    "version": "ALTER TABLE product ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+    "updated_at": "ALTER TABLE product ADD COLUMN updated_at DATETIME",
+}
+
+CATALOG_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL,
+        updated_at DATETIME NOT NULL
+    )
+    """,
+    """
+    INSERT OR IGNORE INTO catalog_version (id, version, updated_at)
+    VALUES (1, 1, CURRENT_TIMESTAMP)
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_row_version
+    AFTER UPDATE OF name, sku, category, price ON product BEGIN
+        UPDATE product SET version = old.version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_version_insert AFTER INSERT ON product BEGIN
+        UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_version_update
+    AFTER UPDATE OF name, sku, category, price ON product BEGIN
+        UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_version_delete AFTER DELETE ON product BEGIN
+        UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+]
+
+CATALOG_VERSION_QUERY = text("SELECT version, updated_at FROM catalog_version WHERE id = 1")
+
+RESPONSE_CACHE_SIZE = 128
+
+
+def init_catalog(connection):
+    """Add version columns to older databases and install the version triggers"""
+    existing = {row[1] for row in connection.execute(text("PRAGMA table_info(product)"))}
+    for column, statement in PRODUCT_COLUMNS.items():
+        if column not in existing:
+            connection.execute(text(statement))
+    for statement in CATALOG_DDL:
+        connection.execute(text(statement))
+
+
+def catalog_version(connection):
+    """Return (version, updated_at) of the catalog"""
+    version, updated_at = connection.execute(CATALOG_VERSION_QUERY).one()
+    return version, as_utc(updated_at)
+
+
+def as_utc(value):
+    # Raw SQL returns SQLite's text timestamp; ORM columns return datetimes
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def catalog_etag(version):
+    return f"catalog-{version}"
+
+
+def product_etag(product_id, version):
+    return f"product-{product_id}-{version}"
+
+
+class ResponseCache:
+    """LRU of serialized response bodies, valid for a single catalog version"""
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.version = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, key):
+        """Return (body, headers) cached for this catalog version, or None"""
+        with self.lock:
+            entry = self.entries.get(key) if version == self.version else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, version, key, body, headers):
+        with self.lock:
+            if self.version is not None and version < self.version:
+                return  # built from an older snapshot than what is cached
+            if version != self.version:
+                # Catalog changed; everything cached for the old version is stale
+                self.version = version
+                self.entries.clear()
+            self.entries[key] = (body, headers)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
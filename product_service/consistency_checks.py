@@ -0,0 +1,187 @@
+"""
+Consistency checks for product writes.
+
+    python consistency_checks.py
+
+Builds the app against a scratch database (the one in instance/ is not
+touched) and checks that:
+
+- a bulk upsert spanning several batches is one transaction: rolling the
+  session back afterwards leaves none of its rows behind;
+- a bulk request that fails after its first batches were written answers
+  500 and leaves no rows behind;
+- re-importing unchanged products reports them as unchanged and leaves the
+  catalog version, price history and change feed alone, while a changed
+  row is updated and emits one event;
+- change events older than the retention are pruned after a write once the
+  prune interval has passed, and not before;
+- renaming a SKU closes the old SKU's price history: the old SKU has no
+  price from the rename on but keeps its price before it, and the new SKU
+  and the product id price as before; history left open by earlier
+  renames is closed when the schema is initialized.
+
+Exits non-zero if any check fails.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from sqlalchemy import func, select, text
+
+import app as product_app
+from bulk import BATCH_SIZE, upsert_products
+from catalog import catalog_version
+from database import db
+from models import Product
+from outbox import latest_seq
+from pricing import init_price_history
+
+
+class Checks:
+    def __init__(self):
+        self.failed = 0
+
+    def check(self, condition, description):
+        print(f"{'ok  ' if condition else 'FAIL'} {description}")
+        if not condition:
+            self.failed += 1
+
+
+def product_count():
+    return db.session.execute(select(func.count()).select_from(Product)).scalar()
+
+
+def history_count():
+    return db.session.execute(text("SELECT count(*) FROM product_price_history")).scalar()
+
+
+def add_old_events(count):
+    """Change events from two days ago, past the default 24 h retention"""
+    with db.engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO product_outbox (product_id, event, payload, created_at) "
+                 "VALUES (0, 'updated', '{}', datetime('now', '-48 hours'))"),
+            [{}] * count,
+        )
+
+
+def old_event_count():
+    return db.session.execute(
+        text("SELECT count(*) FROM product_outbox WHERE created_at < datetime('now', '-24 hours')")
+    ).scalar()
+
+
+def cart_prices(client, items, at=None):
+    """Unit price per cart line, None where the line could not be priced"""
+    body = client.post("/products/prices", json={"items": items, "at": at}).get_json()
+    return [line.get("unit_price") for line in body["items"]]
+
+
+def bulk_rows(prefix, count):
+    return [
+        (index, {"name": f"Book {index}", "sku": f"{prefix}-{index}", "category": "Test", "price": 10.0})
+        for index in range(count)
+    ]
+
+
+def main():
+    product_app.DB_DIR = tempfile.mkdtemp(prefix="product_checks_")
+    product_app.DB_PATH = os.path.join(product_app.DB_DIR, product_app.DB_FILE)
+    app = product_app.create_app()
+    client = app.test_client()
+    checks = Checks()
+
+    with app.app_context():
+        product_app.init_database()
+        before = product_count()
+        count = BATCH_SIZE + BATCH_SIZE // 2
+        upsert_products(db.session, bulk_rows("TX", count))
+        written = product_count()
+        db.session.rollback()
+        checks.check(written == before + count and product_count() == before,
+                     f"rolling back a {count}-row bulk upsert ({count // BATCH_SIZE + 1} batches) removes every row")
+
+    real_upsert = product_app.upsert_products
+
+    def failing_upsert(session, rows):
+        real_upsert(session, rows)
+        raise RuntimeError("injected failure after the batches were written")
+
+    product_app.upsert_products = failing_upsert
+    try:
+        products = [{"name": f"Book {index}", "sku": f"FAIL-{index}", "category": "Test", "price": 10.0}
+                    for index in range(count)]
+        response = client.post("/products/bulk", json=products)
+    finally:
+        product_app.upsert_products = real_upsert
+    with app.app_context():
+        checks.check(response.status_code == 500 and product_count() == before,
+                     "a bulk request failing after its batches were written leaves no rows behind")
+
+    catalog = [{"name": f"Book {index}", "sku": f"SAME-{index}", "category": "Test", "price": 10.0}
+               for index in range(10)]
+    client.post("/products/bulk", json=catalog)
+    with app.app_context():
+        version = catalog_version(db.session.connection())[0]
+        seq, history = latest_seq(db.session.connection()), history_count()
+        db.session.rollback()
+    catalog[0]["price"] = 12.5
+    summary = client.post("/products/bulk", json=catalog).get_json()["summary"]
+    with app.app_context():
+        connection = db.session.connection()
+        checks.check(summary["unchanged"] == 9 and summary["updated"] == 1,
+                     f"re-import reports 9 unchanged and 1 updated product ({summary})")
+        checks.check(catalog_version(connection)[0] == version + 1 and latest_seq(connection) == seq + 1
+                     and history_count() == history + 1,
+                     "only the changed row bumps the catalog version, price history and change feed")
+        db.session.rollback()
+
+    pruner = product_app.outbox_pruner
+    with app.app_context():
+        add_old_events(5)
+    client.put("/products/1", json={"price": 11.0})
+    with app.app_context():
+        checks.check(old_event_count() == 5 and pruner.runs == 0,
+                     "old change events are kept until the prune interval has passed")
+    pruner.next_run = 0  # interval elapsed
+    client.put("/products/1", json={"price": 12.0})
+    with app.app_context():
+        add_old_events(5)
+    client.put("/products/1", json={"price": 13.0})
+    with app.app_context():
+        checks.check(pruner.runs == 1 and pruner.pruned == 5 and old_event_count() == 5,
+                     "a write after the interval prunes old change events, once per interval")
+        db.session.rollback()
+
+    product_id = client.post("/products", json={
+        "name": "Renamed", "sku": "OLD-SKU", "category": "Test", "price": 20.0,
+    }).get_json()["id"]
+    time.sleep(0.01)
+    before_rename = datetime.now(timezone.utc).isoformat()
+    time.sleep(0.01)
+    client.put(f"/products/{product_id}", json={"sku": "NEW-SKU"})
+    now = cart_prices(client, [{"sku": "OLD-SKU"}, {"sku": "NEW-SKU"}, {"product_id": product_id}])
+    checks.check(now == [None, 20.0, 20.0],
+                 f"after a SKU rename the old SKU is unpriced, the new SKU and product id are not ({now})")
+    checks.check(cart_prices(client, [{"sku": "OLD-SKU"}], before_rename) == [20.0],
+                 "the old SKU keeps its price for times before the rename")
+
+    with app.app_context():
+        # History of a rename made before renames closed the old SKU
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO product_price_history (product_id, sku, price) VALUES (:id, 'GONE-SKU', 5.0)"
+            ), {"id": product_id})
+            closed = init_price_history(connection)[1]
+    checks.check(closed == 1 and cart_prices(client, [{"sku": "GONE-SKU"}]) == [None],
+                 "initializing the schema closes price history left open by earlier renames")
+
+    if checks.failed:
+        print(f"{checks.failed} check(s) failed")
+        sys.exit(1)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
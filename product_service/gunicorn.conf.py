@@ -0,0 +1,47 @@
+"""
+Gunicorn settings for product_service; read from the working directory by
+
+    gunicorn 'app:create_app()'
+
+The database is created or upgraded once, in the master process before any
+worker starts (see on_starting); workers only build the app, which does no
+database I/O.
+
+Workers are threaded (gthread) by default. Long-polls on /products/changes
+and clients of /products/changes/stream each hold a thread for as long as
+they are connected; with many such clients use GUNICORN_WORKER_CLASS=gevent
+(and install gevent), or raise GUNICORN_THREADS.
+
+Environment Variables:
+PORT                  - Listen port (default: 5002)
+WEB_CONCURRENCY       - Worker processes (default: 2 x CPUs + 1, at most GUNICORN_MAX_WORKERS)
+GUNICORN_MAX_WORKERS  - Cap for the derived worker count (default: 8)
+GUNICORN_WORKER_CLASS - gthread, gevent or sync (default: gthread)
+GUNICORN_THREADS      - Threads per gthread worker (default: 8)
+GUNICORN_WORKER_CONNECTIONS - Concurrent requests per gevent worker (default: 1000)
+GUNICORN_TIMEOUT      - Seconds before a silent worker is restarted (default: 30)
+"""
+import os
+from eai_common.workers import gunicorn_workers
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5002)}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = gunicorn_workers()
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+
+
+def on_starting(server):
+    """Run init_database() once in the master, then close its connections before forking"""
+    from app import create_app, init_database
+    from database import db
+
+    app = create_app()
+    with app.app_context():
+        init_database()
+        for engine in db.engines.values():
+            engine.dispose()
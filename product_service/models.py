@@ -1,3 +1,4 @@
+from sqlalchemy.sql import func
 from database import db
 
 class Product(db.Model):
@@ -6,6 +7,18 @@ class Product(db.Model):
     sku = db.Column(db.String(50), unique=True, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     price = db.Column(db.Float, nullable=False)
+    # Maintained by triggers (see catalog.py); used for ETag/Last-Modified
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime, server_default=func.now())
+
+    # Listing filters/sorts; SQLite appends the rowid (id) to every index,
+    # which gives the (value, id) order keyset pagination walks
+    __table_args__ = (
+        db.Index("ix_product_price", "price"),
+        db.Index("ix_product_name", "name"),
+        db.Index("ix_product_category_price", "category", "price"),
+        db.Index("ix_product_category_name", "category", "name"),
+    )
 
     def to_dict(self):
         return {
@@ -0,0 +1,156 @@
+"""
+Product change outbox.
+
+Triggers on ``product`` append a row to ``product_outbox`` inside the same
+transaction as every insert, update and delete, so an event exists if and
+only if the change committed. Consumers tail the outbox by sequence number
+through GET /products/changes (long-poll) or /products/changes/stream (SSE)
+and invalidate their caches within a poll interval.
+
+Events older than OUTBOX_RETENTION_HOURS are pruned at startup and then, by
+``OutboxPruner``, after writes at most once per OUTBOX_PRUNE_INTERVAL
+seconds; writes are the only source of events, so the table stays bounded
+while the service runs. A consumer asking for a sequence number that has
+been pruned gets 410 and must resync in full.
+"""
+import json
+import threading
+import time
+from sqlalchemy import text
+
+OUTBOX_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS product_outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        event TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_outbox_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_outbox (product_id, event, payload)
+        VALUES (new.id, 'created', json_object(
+            'id', new.id, 'name', new.name, 'sku', new.sku,
+            'category', new.category, 'price', new.price));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_outbox_update
+    AFTER UPDATE OF name, sku, category, price ON product BEGIN
+        INSERT INTO product_outbox (product_id, event, payload)
+        VALUES (new.id, 'updated', json_object(
+            'id', new.id, 'name', new.name, 'sku', new.sku,
+            'category', new.category, 'price', new.price,
+            'previous_price', old.price));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_outbox_delete AFTER DELETE ON product BEGIN
+        INSERT INTO product_outbox (product_id, event, payload)
+        VALUES (old.id, 'deleted', json_object('id', old.id, 'sku', old.sku));
+    END
+    """,
+]
+
+EVENTS_AFTER = text("""
+    SELECT seq, product_id, event, payload, created_at
+    FROM product_outbox
+    WHERE seq > :after
+    ORDER BY seq
+    LIMIT :limit
+""")
+OUTBOX_BOUNDS = text("SELECT min(seq) FROM product_outbox")
+HIGHEST_SEQ = text("SELECT seq FROM sqlite_sequence WHERE name = 'product_outbox'")
+PRUNE = text("DELETE FROM product_outbox WHERE created_at < datetime('now', :age)")
+
+DEFAULT_BATCH = 100
+MAX_BATCH = 1000
+MAX_WAIT = 30.0
+POLL_INTERVAL = 0.1
+
+
+class OutboxGone(Exception):
+    """The requested position has been pruned; the consumer must resync"""
+
+
+def init_outbox(connection):
+    for statement in OUTBOX_DDL:
+        connection.execute(text(statement))
+
+
+def prune_outbox(connection, retention_hours):
+    return connection.execute(PRUNE, {"age": f"-{retention_hours} hours"}).rowcount
+
+
+class OutboxPruner:
+    """Prunes events older than ``retention_hours`` at most once per ``interval`` seconds"""
+
+    def __init__(self, retention_hours, interval):
+        self.retention_hours = retention_hours
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_run = time.monotonic() + interval
+        self.runs = 0
+        self.pruned = 0
+
+    def due(self):
+        """Claim the next run if it is due, so concurrent writers prune only once"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.next_run:
+                return False
+            self.next_run = now + self.interval
+            return True
+
+    def maybe_prune(self, engine):
+        """Prune in a transaction of its own if due; return the number of events removed"""
+        if not self.due():
+            return 0
+        with engine.begin() as connection:
+            pruned = prune_outbox(connection, self.retention_hours)
+        with self.lock:
+            self.runs += 1
+            self.pruned += pruned
+        return pruned
+
+
+def latest_seq(connection):
+    """Highest sequence number ever assigned (survives pruning)"""
+    return connection.execute(HIGHEST_SEQ).scalar() or 0
+
+
+def read_events(connection, after, limit=DEFAULT_BATCH):
+    """Return events with seq > after, oldest first"""
+    if after < latest_seq(connection):
+        oldest = connection.execute(OUTBOX_BOUNDS).scalar()
+        # Sequence numbers are contiguous, so a gap after `after` means pruning
+        if oldest is None or oldest > after + 1:
+            raise OutboxGone(after)
+    rows = connection.execute(EVENTS_AFTER, {"after": after, "limit": limit}).all()
+    return [
+        {
+            "seq": row.seq,
+            "product_id": row.product_id,
+            "event": row.event,
+            "product": json.loads(row.payload),
+            "created_at": row.created_at,
+        }
+        for row in rows
+    ]
+
+
+def wait_for_events(connect, after, limit=DEFAULT_BATCH, wait=0.0):
+    """
+    Long-poll: return as soon as events exist after ``after`` or ``wait``
+    seconds pass. ``connect`` opens a fresh connection per poll so a waiting
+    request does not hold a pooled connection (or an old WAL snapshot).
+    """
+    deadline = time.monotonic() + min(wait, MAX_WAIT)
+    while True:
+        with connect() as connection:
+            events = read_events(connection, after, limit)
+        if events or time.monotonic() >= deadline:
+            return events
+        time.sleep(POLL_INTERVAL)
@@ -0,0 +1,124 @@
+"""
+Listing queries for GET /products.
+
+Filtering, sorting and paging are pushed into SQL. Pages are keyset-based:
+the cursor is the opaque, base64-encoded (sort value, id) of the last row on
+a page, so every page is an index range scan no matter how deep it is.
+Requests without `limit` or `after` get the whole (filtered) listing, as
+before pagination existed.
+"""
+import base64
+import binascii
+import json
+from sqlalchemy import select, tuple_
+from models import Product
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# sort parameter -> column; prefix with "-" for descending
+SORT_COLUMNS = {
+    "id": Product.id,
+    "price": Product.price,
+    "name": Product.name,
+}
+PRODUCT_FIELDS = ("id", "name", "sku", "category", "price")
+
+
+def encode_cursor(*key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    try:
+        key = json.loads(base64.b64decode(cursor.encode(), altchars=b"-_", validate=True))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key
+
+
+def parse_number(value, name, type=float):
+    """Parse an optional numeric query parameter; ValueError names the parameter"""
+    if value is None or value == "":
+        return None
+    try:
+        return type(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def clamp_page_size(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_sort(sort):
+    """Return (sort name, column, descending) for a sort parameter like '-price'"""
+    sort = sort or "id"
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)} (prefix '-' for descending)")
+    return name, SORT_COLUMNS[name], descending
+
+
+def parse_fields(fields):
+    """Return the requested fields in canonical order, or all fields"""
+    if not fields:
+        return PRODUCT_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(PRODUCT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in PRODUCT_FIELDS if field in requested)
+
+
+def product_page_query(limit, after=None, sort=None, category=None,
+                       min_price=None, max_price=None, fields=PRODUCT_FIELDS):
+    """
+    Build one page of products; fetches limit + 1 rows so the caller can
+    tell whether another page follows. With limit None every matching row
+    is returned.
+    """
+    sort_name, sort_column, descending = parse_sort(sort)
+    # The sort key and id are always selected so the next cursor can be built
+    selected = dict.fromkeys(fields + (sort_name, "id"))
+    query = select(*(getattr(Product, field) for field in selected))
+
+    if category:
+        query = query.where(Product.category == category)
+    if min_price is not None:
+        query = query.where(Product.price >= min_price)
+    if max_price is not None:
+        query = query.where(Product.price <= max_price)
+
+    if sort_name == "id":
+        if after is not None:
+            (last_id,) = decode_cursor(after, 1)
+            query = query.where(Product.id < last_id if descending else Product.id > last_id)
+        order = [Product.id.desc() if descending else Product.id]
+    else:
+        if after is not None:
+            last_value, last_id = decode_cursor(after, 2)
+            key = tuple_(sort_column, Product.id)
+            query = query.where(key < (last_value, last_id) if descending else key > (last_value, last_id))
+        if descending:
+            order = [sort_column.desc(), Product.id.desc()]
+        else:
+            order = [sort_column, Product.id]
+
+    query = query.order_by(*order)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query, sort_name
+
+
+def next_cursor(row, sort_name):
+    if sort_name == "id":
+        return encode_cursor(row.id)
+    return encode_cursor(getattr(row, sort_name), row.id)
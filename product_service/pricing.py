@@ -0,0 +1,224 @@
+"""
+Product price history and point-in-time pricing.
+
+Triggers on ``product`` append to ``product_price_history`` whenever a
+product is created, its price or SKU changes, or it is deleted (recorded as
+a NULL price: not for sale from then on). A SKU change also closes the old
+SKU with a NULL price row, so the old SKU stops pricing from the rename on.
+Each row is effective from its millisecond timestamp until the next row for
+the same SKU, so "price of SKU X at time T" is one descent of the
+(sku, effective_from) index.
+
+Products that existed before history was recorded are backfilled once with
+an effective_from of HISTORY_EPOCH, i.e. "the price since before records
+began". SKUs renamed before renames were closed are closed when the schema
+is next initialized.
+
+A cart is priced in a single query: the requested SKUs or product ids are
+passed as a JSON array and expanded with ``json_each``, each joined to its
+latest history row at or before the requested time.
+"""
+import json
+from datetime import datetime, timezone
+from sqlalchemy import text
+
+HISTORY_EPOCH = "1970-01-01 00:00:00.000"
+# Same text format as strftime('%Y-%m-%d %H:%M:%f'), so timestamps compare as strings
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+MAX_CART_ITEMS = 1000
+
+PRICE_HISTORY_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS product_price_history (
+        id INTEGER PRIMARY KEY,
+        product_id INTEGER NOT NULL,
+        sku VARCHAR(50) NOT NULL,
+        price FLOAT,
+        effective_from TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    )
+    """,
+    # The implicit trailing rowid orders same-millisecond changes
+    """
+    CREATE INDEX IF NOT EXISTS ix_price_history_sku_time
+    ON product_price_history (sku, effective_from)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_price_history_product_time
+    ON product_price_history (product_id, effective_from)
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_price_history_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_price_history (product_id, sku, price)
+        VALUES (new.id, new.sku, new.price);
+    END
+    """,
+    # Replaced so existing databases get the version that closes renamed SKUs.
+    # The closing row is inserted first: a lookup by product id breaks ties on
+    # the same millisecond by id and must land on the new SKU's row.
+    "DROP TRIGGER IF EXISTS product_price_history_update",
+    """
+    CREATE TRIGGER product_price_history_update
+    AFTER UPDATE OF price, sku ON product
+    WHEN new.price IS NOT old.price OR new.sku IS NOT old.sku BEGIN
+        INSERT INTO product_price_history (product_id, sku, price)
+        SELECT old.id, old.sku, NULL WHERE new.sku IS NOT old.sku;
+        INSERT INTO product_price_history (product_id, sku, price)
+        VALUES (new.id, new.sku, new.price);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_price_history_delete AFTER DELETE ON product BEGIN
+        INSERT INTO product_price_history (product_id, sku, price)
+        VALUES (old.id, old.sku, NULL);
+    END
+    """,
+]
+
+BACKFILL = text("""
+    INSERT INTO product_price_history (product_id, sku, price, effective_from)
+    SELECT p.id, p.sku, p.price, :epoch
+    FROM product p
+    WHERE NOT EXISTS (SELECT 1 FROM product_price_history h WHERE h.product_id = p.id)
+""")
+
+# SKUs whose latest row still has a price but that no product carries any more
+CLOSE_RENAMED_SKUS = text("""
+    INSERT INTO product_price_history (product_id, sku, price)
+    SELECT h.product_id, h.sku, NULL
+    FROM product_price_history h
+    WHERE h.id = (
+        SELECT id FROM product_price_history
+        WHERE sku = h.sku
+        ORDER BY effective_from DESC, id DESC
+        LIMIT 1
+    )
+    AND h.price IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM product p WHERE p.sku = h.sku)
+""")
+
+_PRICE_AT = """
+    SELECT k.key AS position, h.product_id, h.sku, h.price, h.effective_from
+    FROM json_each(:keys) AS k
+    LEFT JOIN product_price_history h ON h.id = (
+        SELECT id FROM product_price_history
+        WHERE {column} = k.value AND effective_from <= :at
+        ORDER BY effective_from DESC, id DESC
+        LIMIT 1
+    )
+"""
+PRICE_AT_BY_SKU = text(_PRICE_AT.format(column="sku"))
+PRICE_AT_BY_PRODUCT = text(_PRICE_AT.format(column="product_id"))
+
+HISTORY_QUERY = text("""
+    SELECT sku, price, effective_from
+    FROM product_price_history
+    WHERE product_id = :product_id
+    ORDER BY effective_from, id
+""")
+
+
+def init_price_history(connection):
+    """
+    Create the history table and triggers, backfill products without history
+    and close SKUs that were renamed away; return (backfilled, closed).
+    """
+    for statement in PRICE_HISTORY_DDL:
+        connection.execute(text(statement))
+    backfilled = connection.execute(BACKFILL, {"epoch": HISTORY_EPOCH}).rowcount
+    closed = connection.execute(CLOSE_RENAMED_SKUS).rowcount
+    return backfilled, closed
+
+
+def parse_timestamp(value):
+    """
+    Convert an ISO 8601 timestamp to the stored UTC text format.
+
+    Naive timestamps are taken as UTC; None means now.
+    """
+    if value is None:
+        moment = datetime.now(timezone.utc)
+    else:
+        moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc)
+    return f"{moment.strftime(TIMESTAMP_FORMAT)}.{moment.microsecond // 1000:03d}"
+
+
+def prices_at(connection, at, skus=(), product_ids=()):
+    """
+    Return {("sku", sku) | ("product_id", id): row} with the price in effect
+    at ``at`` (stored format), or None where the product had no price then.
+    """
+    prices = {}
+    for column, keys, query in (
+        ("sku", list(dict.fromkeys(skus)), PRICE_AT_BY_SKU),
+        ("product_id", list(dict.fromkeys(product_ids)), PRICE_AT_BY_PRODUCT),
+    ):
+        if not keys:
+            continue
+        rows = connection.execute(query, {"keys": json.dumps(keys), "at": at}).all()
+        for row in rows:
+            found = row.price is not None
+            prices[(column, keys[row.position])] = row if found else None
+    return prices
+
+
+def price_cart(connection, items, at):
+    """
+    Price cart items at a point in time.
+
+    ``items`` are dicts with ``sku`` or ``product_id`` and ``quantity``.
+    Returns (lines, total); lines keep input order and lines that could not
+    be priced carry an ``error`` instead of a price.
+    """
+    lines = []
+    wanted = []
+    for index, item in enumerate(items):
+        line, key = _cart_line(index, item)
+        lines.append(line)
+        wanted.append(key)
+
+    prices = prices_at(
+        connection,
+        at,
+        skus=[key[1] for key in wanted if key and key[0] == "sku"],
+        product_ids=[key[1] for key in wanted if key and key[0] == "product_id"],
+    )
+
+    total = 0.0
+    for line, key in zip(lines, wanted):
+        if key is None:
+            continue
+        row = prices.get(key)
+        if row is None:
+            line["error"] = "no price in effect at this time"
+            continue
+        line.update({
+            "product_id": row.product_id,
+            "sku": row.sku,
+            "unit_price": row.price,
+            "line_total": round(row.price * line["quantity"], 2),
+            "effective_from": row.effective_from,
+        })
+        total += line["line_total"]
+    return lines, round(total, 2)
+
+
+def _cart_line(index, item):
+    if not isinstance(item, dict):
+        return {"index": index, "error": "each item must be an object"}, None
+    quantity = item.get("quantity", 1)
+    line = {"index": index, "quantity": quantity}
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+        line["error"] = "quantity must be a positive integer"
+        return line, None
+    if item.get("sku") is not None:
+        line["sku"] = str(item["sku"])
+        return line, ("sku", line["sku"])
+    product_id = item.get("product_id")
+    if isinstance(product_id, int) and not isinstance(product_id, bool):
+        line["product_id"] = product_id
+        return line, ("product_id", product_id)
+    line["error"] = "sku or integer product_id is required"
+    return line, None
@@ -0,0 +1,99 @@
+"""
+Full-text product search backed by an SQLite FTS5 index.
+
+``product_fts`` is an external-content FTS5 table over product name, sku and
+category. Triggers on ``product`` keep it in sync for every writer (API
+endpoints, bulk loads, manual SQL), so the application never has to update
+it explicitly.
+
+User input is split into terms combined with AND; every term matches as a
+prefix, so "pyth prog" finds "Python Programming" and results follow the
+user while typing. Every match is ranked with bm25, weighting name matches
+above sku and category matches; the prefix indexes keep short prefixes
+cheap to look up.
+"""
+import re
+from sqlalchemy import text
+
+FTS_TABLE = "product_fts"
+
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, sku, category,
+        content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, category)
+        VALUES (new.id, new.name, new.sku, new.category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, category)
+        VALUES ('delete', old.id, old.name, old.sku, old.category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF name, sku, category ON product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, category)
+        VALUES ('delete', old.id, old.name, old.sku, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, category)
+        VALUES (new.id, new.name, new.sku, new.category);
+    END
+    """,
+]
+
+# bm25 column weights: name, sku, category
+SEARCH_QUERY = text(f"""
+    SELECT p.id, p.name, p.sku, p.category, p.price
+    FROM {FTS_TABLE}
+    JOIN product p ON p.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH :match
+    ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0)
+    LIMIT :limit
+""")
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def init_search(connection):
+    """Create the FTS index and triggers; backfill the index when it is new"""
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    for statement in FTS_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 MATCH expression of quoted prefix terms.
+
+    Quoting each term keeps FTS5 operators and punctuation in user input
+    from being interpreted as query syntax. Returns None when the query has
+    no searchable terms.
+    """
+    terms = _TERM.findall(query or "")
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_products(connection, query, limit=DEFAULT_SEARCH_LIMIT):
+    match = match_expression(query)
+    if match is None:
+        return []
+    return connection.execute(
+        SEARCH_QUERY, {"match": match, "limit": limit}
+    ).mappings().all()
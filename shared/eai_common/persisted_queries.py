@@ -0,0 +1,58 @@
+"""
+Automatic Persisted Queries for the GraphQL services.
+
+Clients send ``extensions.persistedQuery.sha256Hash`` and may omit the query
+text; an unknown hash raises ``PersistedQueryNotFound`` so the client can
+retry once with the full query, which is then remembered.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+
+
+def hash_query(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class PersistedQueryNotFound(Exception):
+    pass
+
+
+class PersistedQueryStore:
+    """Bounded LRU of sha256 hash -> query text"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.queries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def load_manifest(self, path):
+        """Pre-register queries from a JSON file of {hash: query} (e.g. built by the frontend)"""
+        with open(path) as f:
+            for query_hash, query in json.load(f).items():
+                self.register(query_hash, query)
+
+    def register(self, query_hash, query):
+        if hash_query(query) != query_hash:
+            raise ValueError("provided sha256Hash does not match query")
+        self.queries[query_hash] = query
+        self.queries.move_to_end(query_hash)
+        while len(self.queries) > self.maxsize:
+            self.queries.popitem(last=False)
+
+    def resolve(self, query_hash, query=None):
+        """Return the query for a hash, registering it if the text is supplied"""
+        if query is not None:
+            self.register(query_hash, query)
+            return query
+        stored = self.queries.get(query_hash)
+        if stored is None:
+            self.misses += 1
+            raise PersistedQueryNotFound(query_hash)
+        self.hits += 1
+        self.queries.move_to_end(query_hash)
+        return stored
+
+    def stats(self):
+        return {"size": len(self.queries), "hits": self.hits, "misses": self.misses}
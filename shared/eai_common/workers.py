@@ -0,0 +1,36 @@
+"""
+Worker counts for the production launchers (gunicorn.conf.py, serve.py),
+derived from the CPUs the container may use rather than the host's.
+
+Environment Variables:
+WEB_CONCURRENCY       - Worker processes; overrides the derived count
+GUNICORN_MAX_WORKERS  - Cap for the derived gunicorn worker count (default: 8)
+UVICORN_MAX_WORKERS   - Cap for the derived uvicorn worker count (default: 8)
+"""
+import math
+import os
+
+
+def cpu_limit():
+    """CPUs this process may use: the cgroup quota, else CPU affinity, else cpu_count()"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def gunicorn_workers():
+    # Threaded workers spend most of their time waiting on I/O, so run more than one per CPU
+    return int(os.getenv('WEB_CONCURRENCY') or min(2 * cpu_limit() + 1, int(os.getenv('GUNICORN_MAX_WORKERS', 8))))
+
+
+def uvicorn_workers():
+    # An event loop keeps one CPU busy on its own; more workers than CPUs only adds contention
+    return int(os.getenv('WEB_CONCURRENCY') or min(cpu_limit(), int(os.getenv('UVICORN_MAX_WORKERS', 8))))